@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import contextlib
+import statistics
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from car_wash import database
+from car_wash.config import config
+from car_wash.database import async_url, create_engine
+from car_wash.washes.bookings.repository import BookingRepository
+from car_wash.washes.repository import CarWashRepository
+
+# Run against a seeded database: python -m benchmarks.db_pool
+ROUNDS = 500
+CONCURRENCY = 20
+# Short enough to run several times while a variant is measured
+HEALTH_CHECK_INTERVAL = 1  # Seconds
+ROW = '{:<22}{:>12}{:>10}{:>10}'
+
+# Name, engine settings, whether connections are checked in the background
+VARIANTS = [
+    ('pre-ping', {'db_pool_pre_ping': True}, False),
+    ('no pre-ping', {'db_pool_pre_ping': False}, False),
+    ('health check', {'db_pool_pre_ping': False}, True),
+    ('statement cache 0', {'db_prepared_statement_cache_size': 0}, False),
+    ('statement cache 100', {'db_prepared_statement_cache_size': 100}, False),
+    ('statement cache 500', {'db_prepared_statement_cache_size': 500}, False),
+]
+
+
+def get_hot_paths(
+    args: argparse.Namespace,
+) -> list[Callable[[], Awaitable[object]]]:
+    today = date.today()  # noqa: DTZ011
+    week_later = today + timedelta(days=7)
+    car_washes = CarWashRepository()
+    bookings = BookingRepository()
+    return [
+        lambda: car_washes.search_free_slots(
+            args.city,
+            today,
+            week_later,
+            args.body_type_id,
+            120,
+            datetime.now(),  # noqa: DTZ005
+            20,
+        ),
+        lambda: car_washes.fetch_schedule_and_availability(
+            None, today, week_later, args.box_id
+        ),
+        lambda: bookings.fetch_pricing(
+            args.box_id, args.user_car_id, week_later
+        ),
+        lambda: bookings.find_many(1, 10, 'id', {'box_id': args.box_id}),
+    ]
+
+
+@contextlib.asynccontextmanager
+async def use_engine(settings: dict) -> AsyncIterator[AsyncEngine]:
+    defaults = {name: getattr(config, name) for name in settings}
+    for name, value in settings.items():
+        setattr(config, name, value)
+    engine = create_engine(async_url)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    primary = database.async_session_maker, database.replica_session_maker
+    # Repositories read through get_read_session_maker
+    database.async_session_maker = session_maker
+    database.replica_session_maker = session_maker
+    try:
+        yield engine
+    finally:
+        database.async_session_maker, database.replica_session_maker = primary
+        for name, value in defaults.items():
+            setattr(config, name, value)
+        await engine.dispose()
+
+
+async def check_health(engine: AsyncEngine) -> None:
+    # Every pooled connection, not only the one handed out first
+    async def ping() -> None:
+        async with engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+        await asyncio.gather(*(ping() for _ in range(engine.pool.size())))
+
+
+async def handle_request(
+    hot_paths: list[Callable[[], Awaitable[object]]],
+) -> None:
+    # Availability, pricing and a booking list as a request reads them
+    for hot_path in hot_paths:
+        await hot_path()
+
+
+async def measure(
+    hot_paths: list[Callable[[], Awaitable[object]]], rounds: int
+) -> tuple[list[float], float]:
+    window = asyncio.Semaphore(CONCURRENCY)
+    timings = []
+
+    async def call() -> None:
+        async with window:
+            start = time.perf_counter()
+            await handle_request(hot_paths)
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(rounds)))
+    return timings, time.perf_counter() - start
+
+
+async def run_variant(
+    settings: dict,
+    hot_paths: list[Callable[[], Awaitable[object]]],
+    *,
+    health_check: bool,
+) -> tuple[list[float], float]:
+    async with use_engine(settings) as engine:
+        checker = (
+            asyncio.create_task(check_health(engine)) if health_check else None
+        )
+        try:
+            # Opens the pool and fills the statement caches
+            await measure(hot_paths, CONCURRENCY)
+            return await measure(hot_paths, ROUNDS)
+        finally:
+            if checker is not None:
+                checker.cancel()
+
+
+async def run(args: argparse.Namespace) -> None:
+    hot_paths = get_hot_paths(args)
+    print(ROW.format('variant', 'requests/s', 'p50 ms', 'p95 ms'))
+    for name, settings, health_check in VARIANTS:
+        timings, elapsed = await run_variant(
+            settings, hot_paths, health_check=health_check
+        )
+        percentiles = statistics.quantiles(timings, n=100)
+        print(
+            ROW.format(
+                name,
+                f'{len(timings) / elapsed:.0f}',
+                f'{percentiles[49] * 1000:.2f}',
+                f'{percentiles[94] * 1000:.2f}',
+            )
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Repository hot paths under different engine settings'
+    )
+    parser.add_argument('--city', default='Москва')
+    parser.add_argument('--box-id', type=int, default=1)
+    parser.add_argument('--user-car-id', type=int, default=1)
+    parser.add_argument('--body-type-id', type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import asyncio
+import contextlib
+import statistics
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager
+
+from types_aiobotocore_s3.client import S3Client
+
+from car_wash.storage.service import S3Service
+
+# Run next to the application and its MinIO: python -m benchmarks.s3_client
+ROUNDS = 200
+CONCURRENCY = 10
+BODY = b'x' * 1024
+ROW = '{:<16}{:>10}{:>10}{:>10}'
+
+
+@contextlib.asynccontextmanager
+async def shared_client(s3_service: S3Service) -> AsyncIterator[S3Client]:
+    yield await s3_service.get_client()
+
+
+# How every operation got its client before the shared one
+def new_client(s3_service: S3Service) -> AbstractAsyncContextManager:
+    return s3_service.session.create_client('s3', **s3_service.config)
+
+
+async def handle_request(
+    s3_service: S3Service,
+    get_client: Callable[[S3Service], AbstractAsyncContextManager],
+) -> None:
+    # Upload, link and removal of an image as requests make them
+    key = f'benchmarks/{uuid.uuid4()}'
+    bucket = s3_service.bucket_name
+    async with get_client(s3_service) as client:
+        await client.put_object(Bucket=bucket, Key=key, Body=BODY)
+    async with get_client(s3_service) as client:
+        await client.generate_presigned_url(
+            'get_object', Params={'Bucket': bucket, 'Key': key}
+        )
+    async with get_client(s3_service) as client:
+        await client.delete_object(Bucket=bucket, Key=key)
+
+
+async def measure(
+    s3_service: S3Service,
+    get_client: Callable[[S3Service], AbstractAsyncContextManager],
+    rounds: int,
+) -> tuple[list[float], float]:
+    window = asyncio.Semaphore(CONCURRENCY)
+    timings = []
+
+    async def call() -> None:
+        async with window:
+            start = time.perf_counter()
+            await handle_request(s3_service, get_client)
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(rounds)))
+    return timings, time.perf_counter() - start
+
+
+async def run() -> None:
+    s3_service = S3Service()
+    await s3_service.open()
+    try:
+        print(ROW.format('client', 'requests/s', 'p50 ms', 'p95 ms'))
+        for name, get_client in (
+            ('per operation', new_client),
+            ('shared', shared_client),
+        ):
+            # Resolves credentials and opens the first connections
+            await measure(s3_service, get_client, CONCURRENCY)
+            timings, elapsed = await measure(s3_service, get_client, ROUNDS)
+            percentiles = statistics.quantiles(timings, n=100)
+            print(
+                ROW.format(
+                    name,
+                    f'{len(timings) / elapsed:.0f}',
+                    f'{percentiles[49] * 1000:.2f}',
+                    f'{percentiles[94] * 1000:.2f}',
+                )
+            )
+    finally:
+        await s3_service.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
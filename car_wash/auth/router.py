@@ -5,10 +5,13 @@ from fastapi.security import OAuth2PasswordRequestForm
 
 from car_wash.auth.schemas import Tokens, oauth2_scheme
 from car_wash.auth.service import AnnAuthService
+from car_wash.database import get_unit_of_work
 from car_wash.storage.schemas import AnnValidateImage
 from car_wash.users.schemas import UserRegistration
 
-router = APIRouter(prefix='/jwt', tags=['JWT'])
+router = APIRouter(
+    prefix='/jwt', tags=['JWT'], dependencies=[Depends(get_unit_of_work)]
+)
 
 
 @router.post('/register')
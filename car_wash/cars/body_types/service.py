@@ -1,27 +1,19 @@
 from car_wash.cars.body_types.repository import CarBodyTypeRepository
 from car_wash.cars.models import CarBodyType
+from car_wash.utils.filters import FilterOp, make_filter_key
 from car_wash.utils.schemas import GenericListRequest, GenericListResponse
-from car_wash.utils.service import GenericCRUDService
+from car_wash.utils.service import CachedCRUDService
 
 
-class CarBodyTypeService(GenericCRUDService[CarBodyType]):
+class CarBodyTypeService(CachedCRUDService[CarBodyType]):
     repository = CarBodyTypeRepository
 
     async def paginate_necessary_bts(
         self, query: GenericListRequest
     ) -> GenericListResponse:
-        query = query.model_dump()
-        page, limit, order_by = (
-            query.pop('page'),
-            query.pop('limit'),
-            query.pop('order_by'),
-        )
-        filters = {k: v for k, v in query.items() if v is not None}
-        filters['parent_id'] = None
+        filters = query.get_filters()
+        filters[make_filter_key('parent_id', FilterOp.IS_NULL)] = True
 
-        entities = await self.crud_repo.find_many(
-            page, limit, order_by, filters
+        return await self.paginate(
+            query.page, query.limit, query.order_by, filters, query.cursor
         )
-        total_records = await self.crud_repo.count_records(filters)
-        pages = (total_records + limit - 1) // limit
-        return GenericListResponse(data=entities, total=pages, current=page)
@@ -1,6 +1,8 @@
 from car_wash.cars.models import CarBrand
 from car_wash.utils.repository import SQLAlchemyRepository
+from car_wash.utils.search import TrigramSearch
 
 
 class CarBrandRepository(SQLAlchemyRepository):
     model = CarBrand
+    search_backend = TrigramSearch()
@@ -1,7 +1,7 @@
 from car_wash.cars.brands.repository import CarBrandRepository
 from car_wash.cars.models import CarBrand
-from car_wash.utils.service import GenericCRUDService
+from car_wash.utils.service import CachedCRUDService
 
 
-class CarBrandService(GenericCRUDService[CarBrand]):
+class CarBrandService(CachedCRUDService[CarBrand]):
     repository = CarBrandRepository
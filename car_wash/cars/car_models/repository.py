@@ -1,6 +1,8 @@
 from car_wash.cars.models import CarModel
 from car_wash.utils.repository import SQLAlchemyRepository
+from car_wash.utils.search import TrigramSearch
 
 
 class CarModelRepository(SQLAlchemyRepository[CarModel]):
     model = CarModel
+    search_backend = TrigramSearch()
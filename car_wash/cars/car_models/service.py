@@ -1,7 +1,7 @@
 from car_wash.cars.car_models.repository import CarModelRepository
 from car_wash.cars.models import CarModel
-from car_wash.utils.service import GenericCRUDService
+from car_wash.utils.service import CachedCRUDService
 
 
-class CarModelService(GenericCRUDService[CarModel]):
+class CarModelService(CachedCRUDService[CarModel]):
     repository = CarModelRepository
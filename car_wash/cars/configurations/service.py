@@ -1,7 +1,7 @@
 from car_wash.cars.configurations.repository import CarConfigurationRepository
 from car_wash.cars.models import CarConfiguration
-from car_wash.utils.service import GenericCRUDService
+from car_wash.utils.service import CachedCRUDService
 
 
-class CarConfigurationService(GenericCRUDService[CarConfiguration]):
+class CarConfigurationService(CachedCRUDService[CarConfiguration]):
     repository = CarConfigurationRepository
@@ -1,6 +1,8 @@
 from car_wash.cars.models import CarGeneration
 from car_wash.utils.repository import SQLAlchemyRepository
+from car_wash.utils.search import TrigramSearch
 
 
 class CarGenerationRepository(SQLAlchemyRepository[CarGeneration]):
     model = CarGeneration
+    search_backend = TrigramSearch()
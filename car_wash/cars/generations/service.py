@@ -1,7 +1,7 @@
 from car_wash.cars.generations.repository import CarGenerationRepository
 from car_wash.cars.models import CarGeneration
-from car_wash.utils.service import GenericCRUDService
+from car_wash.utils.service import CachedCRUDService
 
 
-class CarGenerationService(GenericCRUDService[CarGeneration]):
+class CarGenerationService(CachedCRUDService[CarGeneration]):
     repository = CarGenerationRepository
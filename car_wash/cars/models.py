@@ -1,15 +1,17 @@
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, String, UniqueConstraint, func
+from sqlalchemy import ForeignKey, Index, String, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from car_wash.database import Base
+from car_wash.utils.search import get_search_indexes
 
 metadata = Base.metadata
 
 
 class CarBrand(Base):
     __tablename__ = 'car__brand'
+    __table_args__ = (*get_search_indexes('ix_car_brand_', 'name'),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(unique=True)
@@ -26,6 +28,7 @@ class CarModel(Base):
             'brand_id',
             name='uix_car_model__name_brand_id',
         ),
+        *get_search_indexes('ix_car_model_', 'name'),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -48,7 +51,9 @@ class CarGeneration(Base):
             'name',
             'model_id',
             name='uix_car_generation__name_model_id',
+            postgresql_nulls_not_distinct=True,
         ),
+        *get_search_indexes('ix_car_generation_', 'name'),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -118,6 +123,10 @@ class CarConfiguration(Base):
 
 class UserCar(Base):
     __tablename__ = 'user_car'
+    __table_args__ = (
+        Index('ix_user_car___user_id', 'user_id'),
+        *get_search_indexes('ix_user_car_', 'name'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
@@ -1,6 +1,8 @@
 from car_wash.cars.models import UserCar
 from car_wash.utils.repository import SQLAlchemyRepository
+from car_wash.utils.search import TrigramSearch
 
 
 class UserCarRepository(SQLAlchemyRepository[UserCar]):
     model = UserCar
+    search_backend = TrigramSearch()
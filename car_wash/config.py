@@ -1,13 +1,31 @@
 from urllib.parse import ParseResult, urlparse, urlunparse
 
-from pydantic import HttpUrl, PostgresDsn, model_validator
+from pydantic import HttpUrl, PostgresDsn, RedisDsn, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Config(BaseSettings):
     database_url: PostgresDsn
+    # Reads outside of transactions go here when set
+    database_replica_url: PostgresDsn | None = None
     secret_key: str
 
+    # Connections per worker: pool_size kept open, up to max_overflow more
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    # A round trip on every checkout, dead connections are otherwise
+    # dropped on the first failed statement and by pool_recycle
+    db_pool_pre_ping: bool = False
+    # Prepared statements asyncpg keeps per connection
+    db_prepared_statement_cache_size: int = 500
+    # Compiled SQL kept by SQLAlchemy, shared by all connections
+    db_query_cache_size: int = 1200
+    # Server side limits in milliseconds, 0 disables them
+    db_statement_timeout: int = 30_000
+    db_idle_in_transaction_timeout: int = 60_000
+
     access_token_expire_minutes: int
     refresh_token_expire_days: int
 
@@ -19,6 +37,19 @@ class Config(BaseSettings):
     s3_access_key: str
     s3_secret_access_key: str
     default_bucket: str = 'default-bucket'
+    # Connection pool of the client shared by all requests of a worker
+    s3_max_pool_connections: int = 20
+    s3_connect_timeout: int = 10
+    s3_read_timeout: int = 60
+    # Processes resizing uploaded images into thumbnails and previews
+    image_variant_workers: int = 2
+    # Keep a table of uploaded files and search it instead of the bucket
+    s3_metadata_index: bool = False
+
+    # In-process cache is used when no url is provided
+    cache_url: RedisDsn | None = None
+    cache_ttl: int = 300
+    cache_max_entries: int = 10_000
 
     debug: bool = False
     in_docker: bool = True
@@ -1,6 +1,11 @@
-from typing import AsyncGenerator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from types import TracebackType
+from typing import Annotated, AsyncGenerator, Awaitable, Callable, Iterator
 
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
@@ -9,20 +14,144 @@ from sqlalchemy.orm import DeclarativeBase
 
 from car_wash.config import config
 
-db_url = config.database_url.unicode_string()
 
+def get_async_url(url: str) -> str:
+    return url.replace('postgresql', 'postgresql+asyncpg')
 
-async_url = db_url.replace('postgresql', 'postgresql+asyncpg')
-async_engine = create_async_engine(
-    async_url, pool_recycle=1800, pool_pre_ping=True
-)
+
+def create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_timeout=config.db_pool_timeout,
+        pool_recycle=config.db_pool_recycle,
+        pool_pre_ping=config.db_pool_pre_ping,
+        query_cache_size=config.db_query_cache_size,
+        connect_args={
+            'prepared_statement_cache_size': (
+                config.db_prepared_statement_cache_size
+            ),
+            'server_settings': {
+                'statement_timeout': str(config.db_statement_timeout),
+                'idle_in_transaction_session_timeout': str(
+                    config.db_idle_in_transaction_timeout
+                ),
+            },
+        },
+    )
+
+
+# Also read by migrations/env.py
+async_url = get_async_url(config.database_url.unicode_string())
+async_engine = create_engine(async_url)
 async_session_maker = async_sessionmaker(async_engine, expire_on_commit=False)
 
+replica_engine = (
+    create_engine(get_async_url(config.database_replica_url.unicode_string()))
+    if config.database_replica_url is not None
+    else async_engine
+)
+replica_session_maker = async_sessionmaker(
+    replica_engine, expire_on_commit=False
+)
+
+# Session of the unit of work bound to the current request, if any
+current_session: ContextVar[AsyncSession | None] = ContextVar(
+    'current_session', default=None
+)
+# Set once the current request has written something, so that its
+# following reads do not miss the write because of replication lag
+primary_reads: ContextVar[bool] = ContextVar('primary_reads', default=False)
+
+# Requests with these methods are not expected to write
+READ_ONLY_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
 
 class Base(DeclarativeBase):
     pass
 
 
+# Every repository call inside the block shares one session and one
+# transaction, which commits on success and rolls back on any exception.
+# A unit of work that is going to write reads through that session too,
+# so its checks see the rows it writes over. Only read-only ones send
+# reads to the replica, which may lag a little behind the primary
+class UnitOfWork:
+    def __init__(self, *, read_only: bool = False):
+        self.read_only = read_only
+        self.session: AsyncSession | None = None
+        self.token: Token | None = None
+
+    async def __aenter__(self) -> 'UnitOfWork':
+        self.session = async_session_maker()
+        self.token = current_session.set(self.session)
+        if not self.read_only:
+            primary_reads.set(True)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        callbacks = []
+        try:
+            if exc_type is None:
+                await self.session.commit()
+                primary_reads.set(True)
+                callbacks = self.session.info.pop('after_commit', [])
+            else:
+                await self.session.rollback()
+        finally:
+            await self.session.close()
+            current_session.reset(self.token)
+
+        for callback in callbacks:
+            await callback()
+
+
+# Defers callback until the unit of work commits,
+# outside of it repositories have already committed by now
+async def run_after_commit(callback: Callable[[], Awaitable[None]]) -> None:
+    session = current_session.get()
+    if session is None:
+        await callback()
+    else:
+        session.info.setdefault('after_commit', []).append(callback)
+
+
+@contextmanager
+def read_from_primary() -> Iterator[None]:
+    token = primary_reads.set(True)
+    try:
+        yield
+    finally:
+        primary_reads.reset(token)
+
+
+def get_read_session_maker() -> async_sessionmaker[AsyncSession]:
+    if primary_reads.get():
+        return async_session_maker
+    return replica_session_maker
+
+
+def reads_from_replica() -> bool:
+    return replica_engine is not async_engine and not primary_reads.get()
+
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+async def get_unit_of_work(
+    request: Request,
+) -> AsyncGenerator[UnitOfWork, None]:
+    read_only = request.method in READ_ONLY_METHODS
+    async with UnitOfWork(read_only=read_only) as uow:
+        yield uow
+
+
+AnnUnitOfWork = Annotated[UnitOfWork, Depends(get_unit_of_work)]
@@ -6,8 +6,10 @@ from fastapi import FastAPI
 from car_wash.auth.router import router as auth_router
 from car_wash.cars.router import router as cars_router
 from car_wash.config import config
+from car_wash.storage.router import router as storage_router
 from car_wash.storage.service import S3Service
 from car_wash.users.router import router as users_router
+from car_wash.utils.cache import cache
 from car_wash.utils.custom_swagger_docs import (
     create_custom_swagger_docs,
     tags_metadata,
@@ -19,12 +21,13 @@ from car_wash.washes.router import sub_router as car_wash_locations_router
 
 @asynccontextmanager
 async def lifespan(_: Any) -> None:
+    await S3Service().open()
     if config.debug:
         await add_default_users_and_roles()
-
-        client = S3Service()
-        await client.create_default_bucket()
+        await S3Service().create_default_bucket()
     yield
+    await cache.close()
+    await S3Service().close()
 
 
 app = FastAPI(
@@ -44,3 +47,4 @@ app.include_router(users_router)
 app.include_router(car_wash_locations_router)
 app.include_router(car_washes_router)
 app.include_router(cars_router)
+app.include_router(storage_router)
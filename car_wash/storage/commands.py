@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from car_wash.storage.service import S3Service
+
+# Run from the project root: python -m car_wash.storage.commands <command>
+COMMANDS: dict[str, Callable[[S3Service], Awaitable[None]]] = {
+    'backfill_variants': S3Service.backfill_variants,
+    'rebuild_file_index': S3Service.rebuild_file_index,
+}
+
+
+async def run(command: str) -> None:
+    s3_service = S3Service()
+    await s3_service.open()
+    try:
+        await COMMANDS[command](s3_service)
+    finally:
+        await s3_service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m car_wash.storage.commands'
+    )
+    parser.add_argument('command', choices=COMMANDS)
+    args = parser.parse_args()
+    asyncio.run(run(args.command))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from car_wash.database import Base
+
+metadata = Base.metadata
+
+
+# What the bucket holds, so files are found without listing it
+class StoredFile(Base):
+    __tablename__ = 'storage__file'
+    __table_args__ = (
+        Index(
+            'ix_storage__file___key_trgm',
+            'key',
+            postgresql_using='gin',
+            postgresql_ops={'key': 'gin_trgm_ops'},
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    key: Mapped[str] = mapped_column(unique=True)
+    content_type: Mapped[str]
+    size: Mapped[int | None] = mapped_column(BigInteger)
+    etag: Mapped[str]
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
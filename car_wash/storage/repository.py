@@ -0,0 +1,46 @@
+from collections.abc import Iterable
+
+from sqlalchemy import delete, or_, select
+
+from car_wash.storage.models import StoredFile
+from car_wash.utils.exception_handling import orm_errors_handler
+from car_wash.utils.repository import SQLAlchemyRepository
+
+
+class StoredFileRepository(SQLAlchemyRepository[StoredFile]):
+    model = StoredFile
+
+    @orm_errors_handler
+    async def find_by_key(
+        self, pattern: str, prefixes: Iterable[str]
+    ) -> list[StoredFile]:
+        async with self.session() as session:
+            query = (
+                select(self.model)
+                .where(
+                    self.model.key.contains(pattern, autoescape=True),
+                    or_(
+                        *(
+                            self.model.key.startswith(prefix, autoescape=True)
+                            for prefix in prefixes
+                        )
+                    ),
+                )
+                .order_by(self.model.key)
+            )
+            res = await session.execute(query)
+            return res.scalars().all()
+
+    @orm_errors_handler
+    async def find_existing_keys(self, keys: list[str]) -> list[str]:
+        async with self.session() as session:
+            query = select(self.model.key).where(self.model.key.in_(keys))
+            res = await session.execute(query)
+            return res.scalars().all()
+
+    @orm_errors_handler
+    async def delete_by_keys(self, keys: list[str]) -> int:
+        async with self.transaction() as session:
+            stmt = delete(self.model).where(self.model.key.in_(keys))
+            res = await session.execute(stmt)
+            return res.rowcount
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+
+from car_wash.storage import schemas
+from car_wash.storage.service import S3Service
+from car_wash.utils.routers import get_admin_router
+
+router = APIRouter()
+
+admin_router = get_admin_router('/storage', tags=['Storage'])
+
+
+@admin_router.get('/files', response_model=schemas.FindFilesResponse)
+async def find_files(pattern: str, directory: schemas.S3Folders | None = None):
+    files = await S3Service().find_files(pattern, directory)
+    return files
+
+
+router.include_router(admin_router)
@@ -2,7 +2,7 @@ from enum import Enum
 from typing import Annotated, Any
 
 from fastapi import Depends, UploadFile
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, HttpUrl, model_validator
 
 from car_wash.storage.dependencies import validate_img
 
@@ -21,4 +21,19 @@ class S3Folders(Enum):
     CAR_WASHES = 'car_washes'
 
 
+class ImageLinks(BaseModel):
+    image_link: HttpUrl
+    thumbnail_link: HttpUrl
+    preview_link: HttpUrl
+
+
+class StoredFile(BaseModel):
+    file_name: str
+    content_type: str
+
+
+class FindFilesResponse(BaseModel):
+    files: list[StoredFile]
+
+
 AnnValidateImage = Annotated[UploadFile | None, Depends(validate_img)]
@@ -1,26 +1,74 @@
+import asyncio
+import base64
+import contextvars
 import functools
+import hashlib
 import inspect
 import logging
+import time
 import uuid
-from contextlib import asynccontextmanager
-from typing import Any, AsyncContextManager, AsyncGenerator
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterable
+from contextlib import AsyncExitStack
+from typing import Any, AsyncGenerator
 
+from aiobotocore.config import AioConfig
 from aiobotocore.session import get_session
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 from fastapi import HTTPException, UploadFile
+from PIL.Image import DecompressionBombError, UnidentifiedImageError
 from types_aiobotocore_s3.client import S3Client
 
 from car_wash.config import config
-from car_wash.storage.schemas import S3Folders
+from car_wash.storage.repository import StoredFileRepository
+from car_wash.storage.schemas import ImageLinks, S3Folders
+from car_wash.storage.variants import (
+    VARIANT_CONTENT_TYPE,
+    ImageVariant,
+    get_process_pool,
+    get_variant_key,
+    is_variant_key,
+    render_variants,
+    shutdown_process_pool,
+)
+from car_wash.utils.cache import cache, dump_cache_value, load_cache_value
+from car_wash.utils.service import SingletonMeta
 
 info_logger = logging.getLogger('uvicorn.debug')
 error_logger = logging.getLogger('uvicorn.error')
 
 UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024  # 5 Mb
+UPLOAD_CONCURRENCY = 4
 EXPIRATION = 3600  # 1 Hour
+# Memoized links are signed again this long before they expire
+LINK_REFRESH_MARGIN = 5 * 60
+LINK_CACHE_MAX_ENTRIES = 10_000
+LINK_NAMESPACE = 'image_link'
+VARIANT_NAMESPACE = 'image_variant'
+VARIANT_EXISTS, VARIANT_MISSING = '1', '0'
+VARIANT_MISSING_TTL = 60
+VARIANT_ATTEMPTS = 3
+VARIANT_RETRY_DELAY = 5  # Seconds, grows with every attempt
+HEAD_CONCURRENCY = 16
+DEFAULT_CONTENT_TYPE = 'application/octet-stream'
 
 
-class S3Service:
+async def read_chunks(
+    file: UploadFile, first_chunks: list[bytes]
+) -> AsyncIterator[bytes]:
+    for chunk in first_chunks:
+        yield chunk
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+# S3 rejects the object or part if the body does not match
+def get_content_md5(chunk: bytes) -> str:
+    digest = hashlib.md5(chunk, usedforsecurity=False).digest()
+    return base64.b64encode(digest).decode()
+
+
+class S3Service(metaclass=SingletonMeta):
     def __init__(self):
         self.config = {
             'aws_access_key_id': config.s3_access_key,
@@ -29,14 +77,51 @@ class S3Service:
                 config.s3_server_url.host, 'minio'
             ),
             'use_ssl': config.use_ssl,
+            'config': AioConfig(
+                max_pool_connections=config.s3_max_pool_connections,
+                connect_timeout=config.s3_connect_timeout,
+                read_timeout=config.s3_read_timeout,
+            ),
         }
         self.bucket_name = config.default_bucket
+        self.file_repo = StoredFileRepository()
         self.session = get_session()
 
-    @asynccontextmanager
-    async def create_client(self) -> AsyncContextManager[S3Client]:
-        async with self.session.create_client('s3', **self.config) as client:
-            yield client
+        # One client with its connection pool per worker, opened with the
+        # application and shared by all requests
+        self.client_stack = AsyncExitStack()
+        self.client: S3Client | None = None
+        self.client_lock = asyncio.Lock()
+        self.links: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        # None tells waiters that the owner was cancelled before signing
+        self.pending_links: dict[str, asyncio.Future[str | None]] = {}
+        # Strong references, the event loop keeps only weak ones
+        self.variant_tasks: set[asyncio.Task] = set()
+
+    async def open(self) -> None:
+        await self.get_client()
+
+    async def close(self) -> None:
+        for task in self.variant_tasks:
+            task.cancel()
+        await asyncio.gather(*self.variant_tasks, return_exceptions=True)
+        shutdown_process_pool()
+
+        async with self.client_lock:
+            await self.client_stack.aclose()
+            self.client = None
+
+    # Opens the client on first use outside of the application,
+    # e.g. in data migration scripts
+    async def get_client(self) -> S3Client:
+        if self.client is not None:
+            return self.client
+        async with self.client_lock:
+            if self.client is None:
+                self.client = await self.client_stack.enter_async_context(
+                    self.session.create_client('s3', **self.config)
+                )
+        return self.client
 
     def display_exception(
         self, e: ClientError, args: Any, kwargs: Any
@@ -94,94 +179,530 @@ class S3Service:
             unique_fn = uuid.uuid4()
             filepath = f'{directory.value}/{unique_fn}'
 
-        async with self.create_client() as client:
-            client: S3Client
+        client = await self.get_client()
+        first_chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        second_chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not second_chunk:
+            resp = await client.put_object(
+                Bucket=self.bucket_name,
+                Key=filepath,
+                Body=first_chunk,
+                ContentType=file.content_type,
+                ContentMD5=get_content_md5(first_chunk),
+            )
+            await self.index_uploaded_file(filepath, file, resp['ETag'])
+            return filepath
+
+        resp = await client.create_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=filepath,
+            ContentType=file.content_type,
+        )
+        upload_id = resp['UploadId']
+        try:
+            parts = await self.upload_parts(
+                client,
+                filepath,
+                upload_id,
+                read_chunks(file, [first_chunk, second_chunk]),
+            )
+            resp = await client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=filepath,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts},
+            )
+        except BaseException:
+            # Parts of an upload that is never completed or aborted stay
+            # in the bucket, also when the request is cancelled
+            await client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=filepath,
+                UploadId=upload_id,
+            )
+            raise
+        await self.index_uploaded_file(filepath, file, resp['ETag'])
+        return filepath
+
+    async def index_uploaded_file(
+        self, filepath: str, file: UploadFile, etag: str
+    ) -> None:
+        await self.index_files(
+            [
+                {
+                    'key': filepath,
+                    'content_type': file.content_type or DEFAULT_CONTENT_TYPE,
+                    'size': file.size,
+                    'etag': etag.strip('"'),
+                }
+            ]
+        )
+
+    async def upload_parts(
+        self,
+        client: S3Client,
+        filepath: str,
+        upload_id: str,
+        chunks: AsyncIterator[bytes],
+    ) -> list[dict[str, str | int]]:
+        # At most UPLOAD_CONCURRENCY parts are in memory and in flight,
+        # the next chunk is read only when one of them is done
+        window = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+        failed = asyncio.Event()
+
+        async def upload_part(part_number: int, chunk: bytes) -> dict:
             try:
-                resp = await client.create_multipart_upload(
-                    Bucket=self.bucket_name,
-                    Key=filepath,
-                    ContentType=file.content_type,
-                )
-                upload_id = resp['UploadId']
-                parts = []
-                part_number = 1
-                while True:
-                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
-                    if not chunk:
-                        break
-
-                    part = await client.upload_part(
-                        Body=chunk,
-                        Bucket=self.bucket_name,
-                        Key=filepath,
-                        UploadId=upload_id,
-                        PartNumber=part_number,
-                    )
-                    parts.append(
-                        {'ETag': part['ETag'], 'PartNumber': part_number}
-                    )
-                    part_number += 1
-                await client.complete_multipart_upload(
+                part = await client.upload_part(
+                    Body=chunk,
                     Bucket=self.bucket_name,
                     Key=filepath,
                     UploadId=upload_id,
-                    MultipartUpload={'Parts': parts},
+                    PartNumber=part_number,
+                    ContentMD5=get_content_md5(chunk),
                 )
+            except BaseException:
+                failed.set()
+                raise
+            finally:
+                window.release()
+            return {'ETag': part['ETag'], 'PartNumber': part_number}
 
-            except ClientError:
-                await client.abort_multipart_upload(
-                    Bucket=self.bucket_name,
-                    Key=filepath,
-                    UploadId=upload_id,
+        tasks = []
+        try:
+            part_number = 1
+            async for chunk in chunks:
+                await window.acquire()
+                # The upload is lost with any failed part, so nothing more
+                # is read or sent and gather raises its error
+                if failed.is_set():
+                    break
+                tasks.append(
+                    asyncio.create_task(upload_part(part_number, chunk))
                 )
-                raise
-        return filepath
+                part_number += 1
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
 
-    async def generate_link(self, filename: str) -> str:
-        async with self.create_client() as client:
-            client: S3Client
+    # Every link is signed once per expiry window: workers share signed
+    # links through the cache and concurrent requests of one worker wait
+    # for the same signing instead of repeating it
+    async def generate_links(self, filenames: Iterable[str]) -> dict[str, str]:
+        now = time.time()
+        links = {}
+        waiting = {}
+        owned = []
+        for filename in dict.fromkeys(filenames):
+            cached = self.links.get(filename)
+            if cached is not None and cached[0] > now:
+                links[filename] = cached[1]
+                self.links.move_to_end(filename)
+            elif filename in self.pending_links:
+                waiting[filename] = self.pending_links[filename]
+            else:
+                owned.append(filename)
+                self.pending_links[filename] = (
+                    asyncio.get_running_loop().create_future()
+                )
+
+        if owned:
+            links.update(await self.resolve_pending_links(owned))
+        for filename, future in waiting.items():
+            # A cancelled waiter must not cancel the future of the others
+            link = await asyncio.shield(future)
+            if link is None:
+                link = await self.generate_link(filename)
+            links[filename] = link
+        return links
+
+    async def resolve_pending_links(self, owned: list[str]) -> dict[str, str]:
+        try:
+            links = await self.load_or_sign_links(owned)
+        except Exception as e:
+            for filename in owned:
+                self.pending_links.pop(filename).set_exception(e)
+            raise
+        except BaseException:
+            # The cancellation is not the waiters', they sign on their own
+            for filename in owned:
+                self.pending_links.pop(filename).set_result(None)
+            raise
+        for filename in owned:
+            self.pending_links.pop(filename).set_result(links[filename])
+        return links
+
+    async def load_or_sign_links(self, filenames: list[str]) -> dict[str, str]:
+        keys = [f'{LINK_NAMESPACE}:{filename}' for filename in filenames]
+        cached = await asyncio.gather(*(cache.get(key) for key in keys))
+
+        now = time.time()
+        links = {}
+        for filename, value in zip(filenames, cached):
+            if value is None:
+                continue
+            reusable_until, url = load_cache_value(value)
+            if reusable_until > now:
+                self.remember_link(filename, reusable_until, url)
+                links[filename] = url
+
+        unsigned = [
+            filename for filename in filenames if filename not in links
+        ]
+        if not unsigned:
+            return links
+
+        client = await self.get_client()
+        reusable_until = now + EXPIRATION - LINK_REFRESH_MARGIN
+        for filename in unsigned:
             url = await client.generate_presigned_url(
                 'get_object',
                 Params={'Bucket': self.bucket_name, 'Key': filename},
                 ExpiresIn=EXPIRATION,
             )
-            return url.replace('minio', config.s3_server_url.host)
+            url = url.replace('minio', config.s3_server_url.host)
+            self.remember_link(filename, reusable_until, url)
+            links[filename] = url
+
+        await asyncio.gather(
+            *(
+                cache.set(
+                    f'{LINK_NAMESPACE}:{filename}',
+                    dump_cache_value([reusable_until, links[filename]]),
+                    EXPIRATION - LINK_REFRESH_MARGIN,
+                )
+                for filename in unsigned
+            )
+        )
+        return links
+
+    def remember_link(
+        self, filename: str, reusable_until: float, url: str
+    ) -> None:
+        self.links[filename] = (reusable_until, url)
+        self.links.move_to_end(filename)
+        while len(self.links) > LINK_CACHE_MAX_ENTRIES:
+            self.links.popitem(last=False)
+
+    async def generate_link(self, filename: str) -> str:
+        links = await self.generate_links([filename])
+        return links[filename]
+
+    # Variants that do not exist (yet) are replaced by the original
+    async def generate_image_links(
+        self, image_paths: Iterable[str]
+    ) -> dict[str, ImageLinks]:
+        image_paths = list(dict.fromkeys(image_paths))
+        variant_keys = await self.find_variants(image_paths)
+        links = await self.generate_links([*image_paths, *variant_keys])
+
+        image_links = {}
+        for path in image_paths:
+            variant_links = {
+                variant: links.get(get_variant_key(path, variant), links[path])
+                for variant in ImageVariant
+            }
+            image_links[path] = ImageLinks(
+                image_link=links[path],
+                thumbnail_link=variant_links[ImageVariant.THUMBNAIL],
+                preview_link=variant_links[ImageVariant.PREVIEW],
+            )
+        return image_links
+
+    async def find_variants(self, image_paths: list[str]) -> set[str]:
+        keys = [
+            get_variant_key(path, variant)
+            for path in image_paths
+            for variant in ImageVariant
+        ]
+        cached = await asyncio.gather(
+            *(cache.get(f'{VARIANT_NAMESPACE}:{key}') for key in keys)
+        )
+        existing = {
+            key for key, value in zip(keys, cached) if value == VARIANT_EXISTS
+        }
+        unknown = [key for key, value in zip(keys, cached) if value is None]
+        if not unknown:
+            return existing
+
+        found = await self.find_existing_files(unknown)
+        await self.remember_variants(found, exist=True)
+        await self.remember_variants(set(unknown) - found, exist=False)
+        return existing | found
+
+    # Missing variants are looked up again soon, they may be on the way
+    async def remember_variants(
+        self, keys: Iterable[str], *, exist: bool
+    ) -> None:
+        value, ttl = (
+            (VARIANT_EXISTS, EXPIRATION)
+            if exist
+            else (VARIANT_MISSING, VARIANT_MISSING_TTL)
+        )
+        await asyncio.gather(
+            *(
+                cache.set(f'{VARIANT_NAMESPACE}:{key}', value, ttl)
+                for key in keys
+            )
+        )
+
+    async def find_existing_files(self, filenames: list[str]) -> set[str]:
+        if config.s3_metadata_index:
+            return set(await self.file_repo.find_existing_keys(filenames))
+
+        client = await self.get_client()
+        window = asyncio.Semaphore(HEAD_CONCURRENCY)
+
+        async def exists(filename: str) -> bool:
+            async with window:
+                try:
+                    await client.head_object(
+                        Bucket=self.bucket_name, Key=filename
+                    )
+                except ClientError as e:
+                    if e.response['Error']['Code'] in {'404', 'NoSuchKey'}:
+                        return False
+                    raise
+            return True
+
+        found = await asyncio.gather(
+            *(exists(filename) for filename in filenames)
+        )
+        return {
+            filename
+            for filename, is_found in zip(filenames, found)
+            if is_found
+        }
 
     @error_handler
     async def remove_file(self, filename: str) -> None:
-        async with self.create_client() as client:
-            client: S3Client
-            await client.delete_object(Bucket=self.bucket_name, Key=filename)
+        client = await self.get_client()
+        await client.delete_object(Bucket=self.bucket_name, Key=filename)
+        variant_keys = [
+            get_variant_key(filename, variant) for variant in ImageVariant
+        ]
+        await client.delete_objects(
+            Bucket=self.bucket_name,
+            Delete={
+                'Objects': [{'Key': key} for key in variant_keys],
+                'Quiet': True,
+            },
+        )
+        if config.s3_metadata_index:
+            await self.file_repo.delete_by_keys([filename, *variant_keys])
+        await self.remember_variants(variant_keys, exist=False)
+
+    # Variants are made in the background, the request does not wait
+    def schedule_variants(self, image_path: str) -> None:
+        # A fresh context, the request's unit of work session must not
+        # be reused after the request is done with it
+        task = asyncio.create_task(
+            self.create_variants_with_retries(image_path),
+            context=contextvars.Context(),
+        )
+        self.variant_tasks.add(task)
+        task.add_done_callback(self.variant_tasks.discard)
+
+    async def create_variants_with_retries(self, image_path: str) -> None:
+        for attempt in range(1, VARIANT_ATTEMPTS + 1):
+            if await self.try_create_variants(image_path, attempt):
+                return
+            if attempt < VARIANT_ATTEMPTS:
+                await asyncio.sleep(VARIANT_RETRY_DELAY * attempt)
+
+    async def try_create_variants(self, image_path: str, attempt: int) -> bool:
+        try:
+            await self.create_variants(image_path)
+        except (BotoCoreError, ClientError):
+            error_logger.exception(
+                'Variants of %s failed, attempt %s', image_path, attempt
+            )
+            return False
+        # Unreadable, truncated or oversized images would fail every time
+        except (UnidentifiedImageError, DecompressionBombError, OSError):
+            error_logger.exception('Variants of %s skipped', image_path)
+        # Nobody awaits the task, anything else would go unnoticed
+        except Exception:
+            error_logger.exception('Variants of %s failed', image_path)
+        return True
+
+    # Safe to run any number of times: variants remember the ETag of the
+    # original they were made from and are skipped while it is the same
+    async def create_variants(self, image_path: str) -> None:
+        client = await self.get_client()
+        head = await client.head_object(
+            Bucket=self.bucket_name, Key=image_path
+        )
+        source_etag = head['ETag'].strip('"')
+
+        variant_keys = [
+            get_variant_key(image_path, variant) for variant in ImageVariant
+        ]
+        if await self.has_variants(image_path, source_etag):
+            await self.remember_variants(variant_keys, exist=True)
+            return
+
+        original = await client.get_object(
+            Bucket=self.bucket_name, Key=image_path, IfMatch=head['ETag']
+        )
+        async with original['Body'] as stream:
+            data = await stream.read()
+
+        loop = asyncio.get_running_loop()
+        variants = await loop.run_in_executor(
+            get_process_pool(), render_variants, data
+        )
+        bodies = {
+            get_variant_key(image_path, variant): body
+            for variant, body in variants.items()
+        }
+        responses = await asyncio.gather(
+            *(
+                client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    Body=body,
+                    ContentType=VARIANT_CONTENT_TYPE,
+                    ContentMD5=get_content_md5(body),
+                    Metadata={'source-etag': source_etag},
+                )
+                for key, body in bodies.items()
+            )
+        )
+        await self.index_files(
+            [
+                {
+                    'key': key,
+                    'content_type': VARIANT_CONTENT_TYPE,
+                    'size': len(body),
+                    'etag': resp['ETag'].strip('"'),
+                }
+                for (key, body), resp in zip(bodies.items(), responses)
+            ]
+        )
+        await self.remember_variants(bodies, exist=True)
+
+    async def has_variants(self, image_path: str, source_etag: str) -> bool:
+        client = await self.get_client()
+        for variant in ImageVariant:
+            try:
+                head = await client.head_object(
+                    Bucket=self.bucket_name,
+                    Key=get_variant_key(image_path, variant),
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] in {'404', 'NoSuchKey'}:
+                    return False
+                raise
+            if head['Metadata'].get('source-etag') != source_etag:
+                return False
+        return True
+
+    # Variants of images uploaded before they were introduced
+    async def backfill_variants(self) -> None:
+        window = asyncio.Semaphore(config.image_variant_workers)
+
+        async def backfill(image_path: str) -> None:
+            async with window:
+                await self.create_variants_with_retries(image_path)
+
+        for folder in S3Folders:
+            objects = await self.list_files(f'{folder.value}/')
+            await asyncio.gather(
+                *(
+                    backfill(obj['Key'])
+                    for obj in objects
+                    if not is_variant_key(obj['Key'])
+                )
+            )
 
     @error_handler
     async def find_files(
-        self, pattern: str
+        self, pattern: str, directory: S3Folders | None = None
     ) -> dict[str, list[dict[str, str]]]:
-        async with self.create_client() as client:
-            client: S3Client
-
-            paginator = client.get_paginator('list_objects_v2')
-            result = []
-            async for page in paginator.paginate(Bucket=self.bucket_name):
-                for obj in page.get('Contents', []):
-                    if pattern in obj['Key']:
-                        filename = obj['Key']
-                        head_response = await client.head_object(
-                            Bucket=self.bucket_name, Key=filename
-                        )
-                        content_type = head_response.get(
-                            'ContentType', 'application/octet-stream'
-                        )
-                        result.append(
-                            {
-                                'file_name': filename,
-                                'content_type': content_type,
-                            }
-                        )
-        return {'files': result}
+        directories = [directory] if directory else list(S3Folders)
+        prefixes = [f'{folder.value}/' for folder in directories]
+
+        if config.s3_metadata_index:
+            stored_files = await self.file_repo.find_by_key(pattern, prefixes)
+            return {
+                'files': [
+                    {
+                        'file_name': stored_file.key,
+                        'content_type': stored_file.content_type,
+                    }
+                    for stored_file in stored_files
+                ]
+            }
+
+        listings = await asyncio.gather(
+            *(self.list_files(prefix) for prefix in prefixes)
+        )
+        filenames = [
+            obj['Key']
+            for listing in listings
+            for obj in listing
+            if pattern in obj['Key']
+        ]
+        content_types = await self.read_content_types(filenames)
+        return {
+            'files': [
+                {'file_name': filename, 'content_type': content_type}
+                for filename, content_type in zip(filenames, content_types)
+            ]
+        }
+
+    async def list_files(self, prefix: str) -> list[dict[str, Any]]:
+        client = await self.get_client()
+        paginator = client.get_paginator('list_objects_v2')
+        objects = []
+        async for page in paginator.paginate(
+            Bucket=self.bucket_name, Prefix=prefix
+        ):
+            objects.extend(page.get('Contents', []))
+        return objects
+
+    async def read_content_types(self, filenames: list[str]) -> list[str]:
+        # Listings carry no content type, so it takes a HEAD per file
+        client = await self.get_client()
+        window = asyncio.Semaphore(HEAD_CONCURRENCY)
+
+        async def read_content_type(filename: str) -> str:
+            async with window:
+                head = await client.head_object(
+                    Bucket=self.bucket_name, Key=filename
+                )
+            return head.get('ContentType', DEFAULT_CONTENT_TYPE)
+
+        return await asyncio.gather(
+            *(read_content_type(filename) for filename in filenames)
+        )
+
+    async def index_files(self, files: list[dict[str, Any]]) -> None:
+        if config.s3_metadata_index:
+            await self.file_repo.upsert_many(files, ['key'])
+
+    # Fills the index with files uploaded before it was turned on
+    async def rebuild_file_index(self) -> None:
+        for folder in S3Folders:
+            objects = await self.list_files(f'{folder.value}/')
+            content_types = await self.read_content_types(
+                [obj['Key'] for obj in objects]
+            )
+            await self.index_files(
+                [
+                    {
+                        'key': obj['Key'],
+                        'content_type': content_type,
+                        'size': obj['Size'],
+                        'etag': obj['ETag'].strip('"'),
+                    }
+                    for obj, content_type in zip(objects, content_types)
+                ]
+            )
 
     @error_handler
     async def create_default_bucket(self) -> None:
-        async with self.create_client() as client:
-            client: S3Client
-            await client.create_bucket(Bucket=self.bucket_name)
+        client = await self.get_client()
+        await client.create_bucket(Bucket=self.bucket_name)
@@ -0,0 +1,67 @@
+import io
+from concurrent.futures import ProcessPoolExecutor
+from enum import StrEnum
+
+from PIL import Image, ImageOps
+
+from car_wash.config import config
+
+VARIANT_FORMAT = 'WEBP'
+VARIANT_CONTENT_TYPE = 'image/webp'
+VARIANT_QUALITY = 80
+
+
+class ImageVariant(StrEnum):
+    THUMBNAIL = 'thumbnail'
+    PREVIEW = 'preview'
+
+
+# Bounding boxes, the aspect ratio is kept
+VARIANT_SIZES = {
+    ImageVariant.THUMBNAIL: (256, 256),
+    ImageVariant.PREVIEW: (1024, 1024),
+}
+
+process_pool: ProcessPoolExecutor | None = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global process_pool  # noqa: PLW0603
+    if process_pool is None:
+        process_pool = ProcessPoolExecutor(config.image_variant_workers)
+    return process_pool
+
+
+def shutdown_process_pool() -> None:
+    global process_pool  # noqa: PLW0603
+    if process_pool is not None:
+        process_pool.shutdown(cancel_futures=True)
+        process_pool = None
+
+
+# Variants live next to the original, so they are found by its path alone
+def get_variant_key(image_path: str, variant: ImageVariant) -> str:
+    return f'{image_path}.{variant.value}.webp'
+
+
+def is_variant_key(key: str) -> bool:
+    return key.endswith(
+        tuple(f'.{variant.value}.webp' for variant in ImageVariant)
+    )
+
+
+# Runs in a worker process, the image is decoded there only
+def render_variants(data: bytes) -> dict[ImageVariant, bytes]:
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        mode = 'RGBA' if 'A' in image.getbands() else 'RGB'
+        image = image.convert(mode)
+
+        variants = {}
+        for variant, size in VARIANT_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail(size)
+            buffer = io.BytesIO()
+            resized.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+            variants[variant] = buffer.getvalue()
+    return variants
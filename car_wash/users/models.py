@@ -30,7 +30,6 @@ class User(Base):
     last_name: Mapped[str]
 
     image_path: Mapped[str] = mapped_column(nullable=True)
-    image_link: Mapped[str] = mapped_column(nullable=True)
 
     confirmed: Mapped[bool]
     active: Mapped[bool]
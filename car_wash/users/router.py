@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends
 
 from car_wash.auth.dependencies import get_user_client
 from car_wash.storage.schemas import AnnValidateImage
@@ -24,12 +24,9 @@ admin_router = get_admin_router('/users', tags=['Users'])
 
 
 @client_router.get('/me', response_model=schemas.UserReadWithRole)
-async def show_logged_user(
-    user: Annotated[User, Depends(get_user_client)],
-    bg_tasks: BackgroundTasks,
-):
+async def show_logged_user(user: Annotated[User, Depends(get_user_client)]):
     user_with_img_link = await UserService().add_img_link_to_user(
-        schemas.UserReadWithRole.model_validate(user), bg_tasks
+        schemas.UserReadWithRole.model_validate(user)
     )
     return user_with_img_link
 
@@ -44,16 +41,14 @@ async def create_user(
 
 
 @admin_router.get('/{id}', response_model=schemas.UserReadWithRole)
-async def read_user(id: int, bg_tasks: BackgroundTasks):
-    user = await UserService().read_user(id, bg_tasks)
+async def read_user(id: int):
+    user = await UserService().read_user(id)
     return user
 
 
 @admin_router.get('', response_model=schemas.ListResponse)
-async def list_users(
-    query: Annotated[schemas.UserList, Depends()], bg_tasks: BackgroundTasks
-):
-    users = await UserService().paginate_users(query, bg_tasks)
+async def list_users(query: Annotated[schemas.UserList, Depends()]):
+    users = await UserService().paginate_users(query)
     return users
 
 
@@ -66,11 +61,8 @@ async def update_user(
     id: int,
     new_values: schemas.UserUpdate,
     img: AnnValidateImage,
-    bg_tasks: BackgroundTasks,
 ):
-    updated_user = await UserService().update_user(
-        id, new_values, img, bg_tasks
-    )
+    updated_user = await UserService().update_user(id, new_values, img)
     return updated_user
 
 
@@ -1,12 +1,9 @@
 from datetime import datetime
 from typing import Literal
 
-from pydantic import BaseModel, Field, HttpUrl, computed_field, field_validator
+from pydantic import BaseModel, Field, HttpUrl, computed_field
 from pydantic.json_schema import SkipJsonSchema
-from pydantic_core import Url
-from pydantic_core.core_schema import ValidationInfo
 
-from car_wash.config import config
 from car_wash.storage.schemas import CustomBaseModel
 from car_wash.users.roles.schemas import RoleRead
 from car_wash.utils.schemas import GenericListRequest, GenericListResponse
@@ -51,6 +48,8 @@ class UserRead(BaseModel):
 
     image_path: str | None = None
     image_link: HttpUrl | None = None
+    thumbnail_link: HttpUrl | None = None
+    preview_link: HttpUrl | None = None
 
     role_id: int
     confirmed: bool
@@ -61,21 +60,6 @@ class UserRead(BaseModel):
     class Config:
         from_attributes = True
 
-    @field_validator('image_link', mode='before')
-    @classmethod
-    def convert_image_link(
-        cls, v: str | HttpUrl, _: ValidationInfo
-    ) -> HttpUrl | None:
-        if not v:
-            return None
-
-        if isinstance(v, Url):
-            return v
-
-        if isinstance(v, str) and config.s3_server_url.host in v:
-            return HttpUrl(v)
-        return HttpUrl(f'{config.s3_server_url}{v.lstrip("/")}')
-
 
 class UserReadWithRole(UserRead):
     role: RoleRead
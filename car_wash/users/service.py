@@ -1,15 +1,12 @@
-import asyncio
 from typing import Annotated, Literal
 
-from fastapi import BackgroundTasks, Depends, UploadFile
-from pydantic import HttpUrl
+from fastapi import Depends, UploadFile
 
 from car_wash.auth.exceptions import CredentialsExc
 from car_wash.auth.schemas import UserCredentials, UserWithPass
 from car_wash.auth.utils import PasswordService
 from car_wash.storage.schemas import S3Folders
 from car_wash.storage.service import S3Service
-from car_wash.storage.utils import validate_link
 from car_wash.users.exceptions import NoDefaultRoleError
 from car_wash.users.models import Role, User
 from car_wash.users.repository import UserRepository
@@ -58,6 +55,7 @@ class UserService(GenericCRUDService[User]):
             unique_filename = await self.s3_service.upload_file(
                 S3Folders.AVATARS, avatar
             )
+            self.s3_service.schedule_variants(unique_filename)
             new_user.image_path = unique_filename
 
         user_id = await self.user_repo.add_one(new_user.model_dump())
@@ -80,52 +78,41 @@ class UserService(GenericCRUDService[User]):
             raise CredentialsExc
         return UserWithPass.model_validate(user)
 
-    async def read_user(
-        self, id_: int, bg_tasks: BackgroundTasks
-    ) -> UserRead | UserReadWithRole:
+    async def read_user(self, id_: int) -> UserRead | UserReadWithRole:
         user = await self.user_repo.find_one(id_, relationships=[User.role])
         return await self.add_img_link_to_user(
-            UserReadWithRole.model_validate(user), bg_tasks
+            UserReadWithRole.model_validate(user)
         )
 
-    async def paginate_users(
-        self, query: UserList, bg_tasks: BackgroundTasks
-    ) -> GenericListResponse:
+    async def paginate_users(self, query: UserList) -> GenericListResponse:
         list_response = await self.paginate_entities(query)
 
-        tasks = [
-            self.add_img_link_to_user(UserRead.model_validate(user), bg_tasks)
-            for user in list_response.data
-        ]
-
-        res = await asyncio.gather(*tasks)
-        list_response.data = res
-
+        users = [UserRead.model_validate(user) for user in list_response.data]
+        list_response.data = await self.add_img_links_to_users(users)
         return list_response
 
     async def add_img_link_to_user(
-        self,
-        user: User | UserRead | UserReadWithRole,
-        bg_tasks: BackgroundTasks,
+        self, user: User | UserRead | UserReadWithRole
     ) -> UserRead | UserReadWithRole:
-        img_link = user.image_link
-
-        if user.image_path and (
-            not img_link or not validate_link(img_link, user.image_path)
-        ):
-            image_link = await self.s3_service.generate_link(user.image_path)
+        users = await self.add_img_links_to_users([user])
+        return users[0]
+
+    async def add_img_links_to_users(
+        self, users: list[User | UserRead | UserReadWithRole]
+    ) -> list[UserRead | UserReadWithRole]:
+        with_image = [user for user in users if user.image_path]
+        # The whole page is signed in one pass, variants included
+        links = await self.s3_service.generate_image_links(
+            user.image_path for user in with_image
+        )
 
-            image_link = HttpUrl(image_link)
-            user.image_link = image_link
-            new_img_link = f'{image_link.path}?{image_link.query}'
+        for user in with_image:
+            image_links = links[user.image_path]
+            user.image_link = image_links.image_link
+            user.thumbnail_link = image_links.thumbnail_link
+            user.preview_link = image_links.preview_link
 
-            bg_tasks.add_task(
-                self.user_repo.change_one,
-                user.id,
-                {'image_link': new_img_link},
-            )
-
-        return user
+        return users
 
     async def read_user_by_name(self, username: str) -> User:
         return await self.user_repo.find_one_by_custom_field(
@@ -149,7 +136,6 @@ class UserService(GenericCRUDService[User]):
         id: int,
         new_values: UserUpdate,
         avatar: UploadFile | None | str,
-        bg_tasks: BackgroundTasks,
     ) -> UserReadWithRole:
         if new_values.password:
             hashed_pass = await self.password_service.a_get_pass_hash(
@@ -162,12 +148,13 @@ class UserService(GenericCRUDService[User]):
             unique_filename = await self.s3_service.upload_file(
                 S3Folders.AVATARS, avatar, user.image_path
             )
+            self.s3_service.schedule_variants(unique_filename)
 
             new_values.image_path = unique_filename
 
         updated_user = await self.update_entity(id, new_values)
         return await self.add_img_link_to_user(
-            UserRead.model_validate(updated_user), bg_tasks
+            UserRead.model_validate(updated_user)
         )
 
     async def delete_user(self, id: int) -> User:
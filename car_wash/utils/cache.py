@@ -0,0 +1,134 @@
+import hashlib
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any
+
+from pydantic_core import from_json, to_json
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from car_wash.config import config
+
+error_logger = logging.getLogger('uvicorn.error')
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_version(self, namespace: str) -> int | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def bump_version(self, namespace: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def close(self) -> None:
+        raise NotImplementedError
+
+
+# Per-process LRU with expiration, every uvicorn worker has its own copy
+class MemoryCache(CacheBackend):
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self.versions: dict[str, int] = {}
+
+    async def get(self, key: str) -> str | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get_version(self, namespace: str) -> int | None:
+        return self.versions.get(namespace, 0)
+
+    async def bump_version(self, namespace: str) -> None:
+        self.versions[namespace] = self.versions.get(namespace, 0) + 1
+        # Entries of previous versions can not be reached anymore
+        prefix = f'{namespace}:'
+        for key in [key for key in self.entries if key.startswith(prefix)]:
+            del self.entries[key]
+
+    async def close(self) -> None:
+        self.entries.clear()
+
+
+# Shared between workers, eviction is left to the server
+# (maxmemory-policy volatile-lru keeps version keys without ttl intact)
+class RedisCache(CacheBackend):
+    def __init__(self, url: str):
+        self.client = Redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> str | None:
+        try:
+            return await self.client.get(key)
+        except RedisError:
+            error_logger.exception('Cache read failed')
+            return None
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        try:
+            await self.client.set(key, value, ex=ttl)
+        except RedisError:
+            error_logger.exception('Cache write failed')
+
+    async def get_version(self, namespace: str) -> int | None:
+        try:
+            version = await self.client.get(f'version:{namespace}')
+        except RedisError:
+            error_logger.exception('Cache read failed')
+            return None
+        return int(version or 0)
+
+    async def bump_version(self, namespace: str) -> None:
+        try:
+            await self.client.incr(f'version:{namespace}')
+        except RedisError:
+            error_logger.exception('Cache invalidation failed')
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def make_cache_key(namespace: str, version: int, *parts: Any) -> str:
+    normalized = to_json(parts)
+    digest = hashlib.sha256(normalized).hexdigest()
+    return f'{namespace}:{version}:{digest}'
+
+
+def dump_cache_value(value: Any) -> str:
+    return to_json(value).decode()
+
+
+def load_cache_value(value: str) -> Any:
+    return from_json(value)
+
+
+cache: CacheBackend = (
+    RedisCache(config.cache_url.unicode_string())
+    if config.cache_url is not None
+    else MemoryCache(config.cache_max_entries)
+)
@@ -24,6 +24,10 @@ tags_metadata = [
         'description': 'and its attributes '
         '(**brands, models, generations, body_types, configurations**)',
     },
+    {
+        'name': 'Storage',
+        'description': 'Files in the **S3** bucket.',
+    },
 ]
 
 
@@ -1,124 +1,151 @@
 import csv
 import json
+import logging
 
-from sqlalchemy import create_engine, select
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import select
 
 from car_wash.auth.utils import PasswordService
-from car_wash.cars.models import (
-    CarBodyType,
-    CarBrand,
-    CarConfiguration,
-    CarGeneration,
-    CarModel,
+from car_wash.cars.body_types.repository import CarBodyTypeRepository
+from car_wash.cars.brands.repository import CarBrandRepository
+from car_wash.cars.car_models.repository import CarModelRepository
+from car_wash.cars.configurations.repository import (
+    CarConfigurationRepository,
 )
+from car_wash.cars.generations.repository import CarGenerationRepository
 from car_wash.config import config
 from car_wash.database import async_session_maker
 from car_wash.users.models import Role, User
+from car_wash.utils.cache import cache
+
+CARS_DATASET = 'car_wash/utils/data_migration/data_sets/cars.json'
+READ_CHUNK_SIZE = 64 * 1024
+BRANDS_PER_BATCH = 20
+
+info_logger = logging.getLogger('uvicorn.error')
+
+
+def iter_json_array(path, chunk_size=READ_CHUNK_SIZE):
+    # Отдаёт элементы JSON-массива по одному, не загружая файл целиком
+    decoder = json.JSONDecoder()
+    with open(path, encoding='UTF-8') as file:
+        buffer = file.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f'{path} does not contain a JSON array')
+        buffer = buffer[1:]
+        eof = False
+
+        while True:
+            buffer = buffer.lstrip()
+            if buffer.startswith(','):
+                buffer = buffer[1:].lstrip()
+            if buffer.startswith(']'):
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+
+            yield item
+            buffer = buffer[end:]
+
+
+async def fill_db_cars():
+    body_type_ids = {}
+    batch = []
+    loaded = 0
+    try:
+        for brand_data in iter_json_array(CARS_DATASET):
+            batch.append(brand_data)
+            if len(batch) == BRANDS_PER_BATCH:
+                loaded += await load_cars_batch(batch, body_type_ids)
+                info_logger.info('Loaded %s car brands', loaded)
+                batch = []
+
+        if batch:
+            loaded += await load_cars_batch(batch, body_type_ids)
+        info_logger.info('Car catalog loaded, %s brands in total', loaded)
+    finally:
+        await invalidate_car_catalog_cache()
+        config.filling_db = False
+
+
+async def invalidate_car_catalog_cache():
+    # Загрузка идёт в обход сервисов, поэтому кэш каталога сбрасывается вручную
+    for repository in (
+        CarBrandRepository,
+        CarModelRepository,
+        CarGenerationRepository,
+        CarBodyTypeRepository,
+        CarConfigurationRepository,
+    ):
+        await cache.bump_version(repository.model.__tablename__)
+
+
+async def load_cars_batch(brands, body_type_ids):
+    # Каждый уровень каталога записывается одним upsert на всю пачку,
+    # id родителей берутся из результатов предыдущего уровня
+    brand_ids = await CarBrandRepository().upsert_many(
+        [{'name': brand_data['name']} for brand_data in brands]
+    )
+
+    models = []
+    model_rows = []
+    for brand_data, brand_id in zip(brands, brand_ids):
+        for model_data in brand_data['models']:
+            models.append(model_data)
+            model_rows.append(
+                {'name': model_data['name'], 'brand_id': brand_id}
+            )
+    model_ids = await CarModelRepository().upsert_many(model_rows)
 
-DATABASE_URL = config.database_url.unicode_string()
-engine = create_engine(DATABASE_URL)
-session_maker = sessionmaker(bind=engine)
-
+    generations = []
+    generation_rows = []
+    for model_data, model_id in zip(models, model_ids):
+        for generation_data in model_data['generations']:
+            start_year = generation_data['year-start']
+            end_year = generation_data['year-stop']
 
-def fill_db_cars():
-    print('до')
-    with open(
-        'car_wash/utils/data_migration/data_sets/cars.json', encoding='UTF-8'
-    ) as file:
-        data = json.load(file)
-    print('после')
-
-    with session_maker() as session:
-        print('начал')
-        counter = 0
-        for brand_data in data:
-            counter += 1
-            print(counter)
-            if counter % 15 == 0:
-                print(counter)
-
-            brand_name = brand_data['name']
-            brand = session.query(CarBrand).filter_by(name=brand_name).first()
-            if not brand:
-                brand = CarBrand(name=brand_name)
-                session.add(brand)
-                session.commit()
-
-            for model_data in brand_data['models']:
-                # Создание или получение записи CarModel
-                model_name = model_data['name']
-                model = (
-                    session.query(CarModel)
-                    .filter_by(name=model_name, brand_id=brand.id)
-                    .first()
-                )
-                if not model:
-                    model = CarModel(name=model_name, brand_id=brand.id)
-                    session.add(model)
-                    session.commit()
-
-                for generation_data in model_data['generations']:
-                    # Создание или получение записи CarGeneration
-                    generation_name = generation_data['name']
-                    start_year = generation_data['year-start']
-                    end_year = generation_data['year-stop']
-
-                    if start_year is None:
-                        start_year = 'past'
-                    if end_year is None:
-                        end_year = 'present'
-
-                    generation = (
-                        session.query(CarGeneration)
-                        .filter_by(name=generation_name, model_id=model.id)
-                        .first()
-                    )
-                    if not generation:
-                        generation = CarGeneration(
-                            name=generation_name,
-                            model_id=model.id,
-                            start_year=start_year,
-                            end_year=end_year,
-                        )
-                        session.add(generation)
-                        session.commit()
-
-                    for configuration_data in generation_data[
-                        'configurations'
-                    ]:
-                        # Создание или получение записи CarBodyType
-                        body_type_name = configuration_data['body-type']
-                        body_type = (
-                            session.query(CarBodyType)
-                            .filter_by(name=body_type_name)
-                            .first()
-                        )
-                        if not body_type:
-                            body_type = CarBodyType(name=body_type_name)
-                            session.add(body_type)
-                            session.commit()
-
-                        # Создание записи CarConfiguration
-                        configuration = (
-                            session.query(CarConfiguration)
-                            .filter_by(
-                                generation_id=generation.id,
-                                body_type_id=body_type.id,
-                            )
-                            .first()
-                        )
-                        if not configuration:
-                            configuration = CarConfiguration(
-                                generation_id=generation.id,
-                                body_type_id=body_type.id,
-                            )
-                            session.add(configuration)
-                            session.commit()
+            generations.append(generation_data)
+            generation_rows.append(
+                {
+                    'name': generation_data['name'],
+                    'model_id': model_id,
+                    'start_year': 'past' if start_year is None else str(start_year),
+                    'end_year': 'present' if end_year is None else str(end_year),
+                }
+            )
+    generation_ids = await CarGenerationRepository().upsert_many(
+        generation_rows
+    )
+
+    new_body_types = {
+        configuration_data['body-type']
+        for generation_data in generations
+        for configuration_data in generation_data['configurations']
+    } - body_type_ids.keys()
+    if new_body_types:
+        # Существующим кузовам upsert не меняет parent_id
+        ids = await CarBodyTypeRepository().upsert_many(
+            [{'name': name} for name in new_body_types]
+        )
+        body_type_ids.update(zip(new_body_types, ids))
 
-    config.filling_db = False
-    print('Данные успешно обработаны.')
+    configuration_rows = [
+        {
+            'generation_id': generation_id,
+            'body_type_id': body_type_ids[configuration_data['body-type']],
+        }
+        for generation_data, generation_id in zip(generations, generation_ids)
+        for configuration_data in generation_data['configurations']
+    ]
+    await CarConfigurationRepository().upsert_many(configuration_rows)
+    return len(brands)
 
 
 token_service = PasswordService()
@@ -211,48 +238,32 @@ def read_csv():
     return car_body_data
 
 
-def upsert_car_body_types(session: Session, data):
+async def upsert_car_body_types(data):
+    repository = CarBodyTypeRepository()
+
     # Сначала добавляем кузова без родительских элементов
-    for row in data:
-        if row['parent_name'] is None or row['parent_name'] == 'None':
-            # Добавляем кузова без родителей
-            values = {
-                "name": row['name'],
-                "parent_id": None,
-            }
-            stmt = insert(CarBodyType).values(values)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=['name'],
-                set_=values,
-            )
-            session.execute(stmt)
+    parents = [
+        {"name": row['name'], "parent_id": None}
+        for row in data
+        if row['parent_name'] is None
+    ]
+    parent_ids = await repository.upsert_many(parents)
+    ids_by_name = {
+        row['name']: id_ for row, id_ in zip(parents, parent_ids)
+    }
 
     # Теперь добавляем кузова с родительскими элементами
-    for row in data:
-        if row['parent_name'] and row['parent_name'] != 'None':
-            parent = session.scalar(
-                select(CarBodyType.id).where(
-                    CarBodyType.name == row['parent_name']
-                )
-            )
-
-            values = {
-                "name": row['name'],
-                "parent_id": parent if parent is not None else None,
-            }
-            stmt = insert(CarBodyType).values(values)
-            stmt = stmt.on_conflict_do_update(
-                index_elements=['name'],
-                set_=values,
-            )
-            session.execute(stmt)
-
-    session.commit()
+    children = [
+        {"name": row['name'], "parent_id": ids_by_name.get(row['parent_name'])}
+        for row in data
+        if row['parent_name'] is not None
+    ]
+    await repository.upsert_many(children)
 
 
 async def update_db_with_body_types():
     data = read_csv()
-    with session_maker() as session:
-        upsert_car_body_types(session, data)
+    await upsert_car_body_types(data)
+    await invalidate_car_catalog_cache()
     config.filling_db = False
     print('car__body_type успешно обновлены')
@@ -4,7 +4,7 @@ from typing import TYPE_CHECKING, Any, Callable
 
 from fastapi import HTTPException
 from parse import Result, compile
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import DBAPIError, IntegrityError
 
 if TYPE_CHECKING:
     from car_wash.utils.repository import SQLAlchemyRepository
@@ -19,8 +19,18 @@ NOT_NULL_PATTERN = compile(
     'null value in column "{column_name}" violates not-null constraint'
 )
 
+EXCLUSION_PATTERN = compile(
+    'conflicting key value violates exclusion constraint "{constraint}"'
+)
+
+DEADLOCK_DETECTED = '40P01'
 
-def handle_integrity_error(e: IntegrityError, table_name: str) -> None:
+
+def handle_integrity_error(
+    e: IntegrityError,
+    table_name: str,
+    exclusion_error: type[HTTPException] | None = None,
+) -> None:
     table_slug = table_name.capitalize().replace('_', ' ')
     original_driver_exception = str(e.orig)
 
@@ -48,6 +58,15 @@ def handle_integrity_error(e: IntegrityError, table_name: str) -> None:
         msg = f'Field {column_name} is required'.replace('"', '')
         raise HTTPException(status_code=409, detail=msg)
 
+    exclusion = EXCLUSION_PATTERN.search(original_driver_exception)
+    if exclusion:
+        if exclusion_error is not None:
+            raise exclusion_error from None
+        raise HTTPException(
+            status_code=409,
+            detail=f'{table_slug} conflicts with an existing one',
+        ) from None
+
     raise HTTPException(status_code=500) from e
 
 
@@ -95,7 +114,16 @@ def orm_errors_handler(
                     status_code=404, detail=f'{self.model}, {details}'
                 )
         except IntegrityError as e:
-            handle_integrity_error(e, self.model.__tablename__)
+            handle_integrity_error(
+                e, self.model.__tablename__, self.exclusion_error
+            )
+        except DBAPIError as e:
+            # Overlapping rows inserted at the same time wait for each
+            # other in the exclusion check and postgres aborts one of them
+            sqlstate = getattr(e.orig, 'sqlstate', None)
+            if self.exclusion_error is None or sqlstate != DEADLOCK_DETECTED:
+                raise
+            raise self.exclusion_error from None
         else:
             return result
 
@@ -0,0 +1,9 @@
+from fastapi import HTTPException
+
+
+class InvalidCursorError(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=400,
+            detail='Cursor is malformed or was issued for another ordering',
+        )
@@ -0,0 +1,102 @@
+import operator
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import ColumnElement, and_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from car_wash.utils.search import SearchBackend
+
+LIKE_SUFFIX = '_like'
+KEY_SEPARATOR = '__'
+
+
+class FilterOp(str, Enum):
+    EQ = 'eq'
+    LIKE = 'like'
+    IN = 'in'
+    GT = 'gt'
+    GE = 'ge'
+    LT = 'lt'
+    LE = 'le'
+    IS_NULL = 'is_null'
+    # Any moment of the given day
+    ON_DATE = 'on_date'
+
+
+# Field metadata of list schemas, e.g.
+# start_from: Annotated[datetime | None, Filter('start_datetime', FilterOp.GE)]
+@dataclass(frozen=True)
+class Filter:
+    column: str | None = None
+    op: FilterOp = FilterOp.EQ
+
+
+Expression = Callable[[Any], ColumnElement[bool]]
+
+COMPARISONS = {
+    FilterOp.GT: operator.gt,
+    FilterOp.GE: operator.ge,
+    FilterOp.LT: operator.lt,
+    FilterOp.LE: operator.le,
+}
+
+
+def get_filter_spec(schema: type[BaseModel], skip: set[str]) -> dict[str, str]:
+    # Field name of the schema -> filter key understood by repositories
+    spec = {}
+    for name, field in schema.model_fields.items():
+        if name in skip:
+            continue
+
+        declared = next(
+            (item for item in field.metadata if isinstance(item, Filter)),
+            None,
+        )
+        if declared is not None:
+            column, op = declared.column or name, declared.op
+        elif name.endswith(LIKE_SUFFIX):
+            column, op = name.removesuffix(LIKE_SUFFIX), FilterOp.LIKE
+        else:
+            column, op = name, FilterOp.EQ
+        spec[name] = make_filter_key(column, op)
+    return spec
+
+
+def make_filter_key(column: str, op: FilterOp) -> str:
+    if op is FilterOp.EQ:
+        return column
+    return f'{column}{KEY_SEPARATOR}{op.value}'
+
+
+def parse_filter_key(key: str) -> tuple[str, FilterOp]:
+    column, _, op = key.partition(KEY_SEPARATOR)
+    return column, FilterOp(op or FilterOp.EQ)
+
+
+def compile_filter(
+    column: InstrumentedAttribute, op: FilterOp, search_backend: SearchBackend
+) -> Expression:
+    if op is FilterOp.EQ:
+        return lambda value: column == value
+    if op is FilterOp.LIKE:
+        return lambda value: search_backend.get_expression(column, value)
+    if op is FilterOp.IN:
+        return column.in_
+    if op is FilterOp.IS_NULL:
+        return lambda value: column.is_(None) if value else column.isnot(None)
+    if op is FilterOp.ON_DATE:
+        return lambda value: get_date_window(column, value)
+    compare = COMPARISONS[op]
+    return lambda value: compare(column, value)
+
+
+def get_date_window(
+    column: InstrumentedAttribute, day: date
+) -> ColumnElement[bool]:
+    day_start = datetime.combine(day, time.min)
+    return and_(column >= day_start, column < day_start + timedelta(days=1))
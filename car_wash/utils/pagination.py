@@ -0,0 +1,35 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Any
+
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import to_jsonable_python
+from sqlalchemy.orm import InstrumentedAttribute
+
+from car_wash.utils.exceptions import InvalidCursorError
+
+
+def encode_cursor(order_column: InstrumentedAttribute, entity: Any) -> str:
+    payload = [order_column.key, getattr(entity, order_column.key), entity.id]
+    raw = json.dumps(to_jsonable_python(payload)).encode()
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(
+    cursor: str, order_column: InstrumentedAttribute
+) -> tuple[Any, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        order_by, value, id_ = json.loads(urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursorError from None
+
+    if order_by != order_column.key or not isinstance(id_, int):
+        raise InvalidCursorError
+
+    try:
+        value_type = order_column.type.python_type
+        value = TypeAdapter(value_type | None).validate_python(value)
+    except ValidationError:
+        raise InvalidCursorError from None
+    return value, id_
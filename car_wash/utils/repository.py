@@ -1,25 +1,56 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, ClassVar, Generic, TypeVar
 
+from fastapi import HTTPException
 from sqlalchemy import (
+    BigInteger,
     BinaryExpression,
+    ScalarSelect,
+    UniqueConstraint,
     and_,
+    cast,
+    column,
     delete,
     func,
     insert,
+    or_,
     orm,
     select,
+    table,
+    tuple_,
     update,
 )
-from sqlalchemy.orm import QueryableAttribute
-from sqlalchemy.sql.expression import Select
-
-from car_wash.database import async_session_maker
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, QueryableAttribute
+from sqlalchemy.orm.util import AliasedClass
+from sqlalchemy.sql.expression import ColumnElement, Select
+
+from car_wash.database import (
+    async_session_maker,
+    current_session,
+    get_read_session_maker,
+    primary_reads,
+    reads_from_replica,
+)
 from car_wash.utils.exception_handling import orm_errors_handler
+from car_wash.utils.filters import (
+    Expression,
+    FilterOp,
+    compile_filter,
+    parse_filter_key,
+)
+from car_wash.utils.pagination import decode_cursor
 from car_wash.utils.schemas import AnyModel
+from car_wash.utils.search import SearchBackend, SubstringSearch
 
 T = TypeVar('T')
 
+UPSERT_BATCH_SIZE = 1000
+# asyncpg can bind at most 32767 parameters in one statement
+MAX_QUERY_PARAMETERS = 32767
+
 
 class AbstractRepository(ABC, Generic[T]):
     model: type[AnyModel | T]
@@ -51,7 +82,9 @@ class AbstractRepository(ABC, Generic[T]):
         raise NotImplementedError
 
     @abstractmethod
-    async def change_one(self, id: int, data: dict) -> T:
+    async def change_one(
+        self, id: int, data: dict, relationships: list | None = None
+    ) -> T:
         raise NotImplementedError
 
     @abstractmethod
@@ -65,26 +98,160 @@ class AbstractRepository(ABC, Generic[T]):
 
 class SQLAlchemyRepository(AbstractRepository[T]):
     raise_404_when_find_one_not_found = True
+    estimate_total = False
+    # Raised instead of the generic 409 when an exclusion constraint fails
+    exclusion_error: type[HTTPException] | None = None
+    search_backend: SearchBackend = SubstringSearch()
+    compiled_filters: ClassVar[dict[str, Expression]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.compiled_filters = {}
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        # Until a read-only unit of work writes, its reads can go to the
+        # replica
+        session = current_session.get()
+        if session is not None and not reads_from_replica():
+            yield session
+            return
+
+        async with get_read_session_maker()() as session:
+            yield session
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[AsyncSession]:
+        primary_reads.set(True)
+        # Inside a unit of work the commit is left to the unit of work
+        session = current_session.get()
+        if session is not None:
+            yield session
+            return
+
+        async with async_session_maker() as session, session.begin():
+            yield session
 
     @orm_errors_handler
     async def add_one(self, data: dict) -> int:
-        async with async_session_maker() as session:
+        async with self.transaction() as session:
             stmt = insert(self.model).values(data).returning(self.model.id)
             res = await session.execute(stmt)
-            await session.commit()
             return res.scalar_one()
 
     @orm_errors_handler
     async def add_many(self, data: dict) -> list[int]:
-        async with async_session_maker() as session:
+        async with self.transaction() as session:
             stmt = insert(self.model).values(data).returning(self.model.id)
             res = await session.execute(stmt)
-            await session.commit()
             return res.scalars().all()
 
+    @orm_errors_handler
+    async def upsert_many(
+        self,
+        data: list[dict],
+        conflict_columns: list[str] | None = None,
+        batch_size: int = UPSERT_BATCH_SIZE,
+    ) -> list[int]:
+        if not data:
+            return []
+
+        conflict_columns = conflict_columns or self.get_conflict_columns()
+        columns = list(data[0])
+        update_columns = [
+            column for column in columns if column not in conflict_columns
+        ]
+        batch_size = min(batch_size, MAX_QUERY_PARAMETERS // len(columns))
+
+        # A statement may not touch the same row twice, so duplicates
+        # collapse into the last occurrence
+        rows_by_key = {
+            tuple(row[column] for column in conflict_columns): row
+            for row in data
+        }
+
+        async with self.transaction() as session:
+            # ON CONFLICT cannot be relied on to match NULLs in the key,
+            # so rows with one are matched to the existing ones by lookup
+            ids_by_key = await self.find_ids_by_key(
+                session,
+                [key for key in rows_by_key if None in key],
+                conflict_columns,
+            )
+            if ids_by_key and update_columns:
+                await session.execute(
+                    update(self.model),
+                    [
+                        {'id': ids_by_key[key], **rows_by_key[key]}
+                        for key in ids_by_key
+                    ],
+                )
+            rows = [
+                row
+                for key, row in rows_by_key.items()
+                if key not in ids_by_key
+            ]
+            for start in range(0, len(rows), batch_size):
+                stmt = pg_insert(self.model).values(
+                    rows[start : start + batch_size]
+                )
+                # Updating at least one column makes RETURNING also
+                # yield the ids of rows that already existed
+                set_columns = update_columns or conflict_columns
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=conflict_columns,
+                    set_={
+                        column: stmt.excluded[column] for column in set_columns
+                    },
+                ).returning(
+                    self.model.id,
+                    *(
+                        getattr(self.model, column)
+                        for column in conflict_columns
+                    ),
+                )
+                res = await session.execute(stmt)
+                for id_, *key in res:
+                    ids_by_key[tuple(key)] = id_
+
+        return [
+            ids_by_key[tuple(row[column] for column in conflict_columns)]
+            for row in data
+        ]
+
+    async def find_ids_by_key(
+        self,
+        session: AsyncSession,
+        keys: list[tuple],
+        key_columns: list[str],
+    ) -> dict[tuple, int]:
+        columns = [getattr(self.model, column) for column in key_columns]
+        batch_size = MAX_QUERY_PARAMETERS // len(key_columns)
+        ids_by_key = {}
+        for start in range(0, len(keys), batch_size):
+            query = select(self.model.id, *columns).where(
+                or_(
+                    *(
+                        and_(
+                            *(
+                                column.is_(None)
+                                if value is None
+                                else column == value
+                                for column, value in zip(columns, key)
+                            )
+                        )
+                        for key in keys[start : start + batch_size]
+                    )
+                )
+            )
+            res = await session.execute(query)
+            for id_, *key in res:
+                ids_by_key[tuple(key)] = id_
+        return ids_by_key
+
     @orm_errors_handler
     async def find_one(self, id: int, relationships: list | None = None) -> T:
-        async with async_session_maker() as session:
+        async with self.session() as session:
             query = select(self.model).where(self.model.id == id)
             query = self.add_joined_loads(query, relationships)
 
@@ -99,7 +266,7 @@ class SQLAlchemyRepository(AbstractRepository[T]):
         relationships: list | None = None,
     ) -> T:
         column: orm.MappedColumn = getattr(self.model, custom_field)
-        async with async_session_maker() as session:
+        async with self.session() as session:
             query = select(self.model).where(column == custom_value)
             query = self.add_joined_loads(query, relationships)
 
@@ -113,7 +280,7 @@ class SQLAlchemyRepository(AbstractRepository[T]):
         relationships: list | None = None,
     ) -> T:
         expressions = self.get_expressions(filters)
-        async with async_session_maker() as session:
+        async with self.session() as session:
             query = select(self.model).where(and_(*expressions))
             query = self.add_joined_loads(query, relationships)
 
@@ -130,17 +297,84 @@ class SQLAlchemyRepository(AbstractRepository[T]):
         relationships: list | None = None,
     ) -> list[T]:
         offset_value = page * limit - limit
-        async with async_session_maker() as session:
+        async with self.session() as session:
             query = (
                 select(self.model)
                 .offset(offset_value)
                 .limit(limit)
-                .order_by(order_by)
+                .order_by(
+                    *self.get_search_ranking(filters),
+                    *self.get_ordering(order_by),
+                )
             )
-            if filters:
-                expressions = self.get_expressions(filters)
-                query = query.where(and_(*expressions))
+            query = self.apply_filters(query, filters)
+            query = self.add_joined_loads(query, relationships)
+
+            res = await session.execute(query)
+            return res.unique().scalars().all()
+
+    @orm_errors_handler
+    async def find_many_with_total(
+        self,
+        page: int,
+        limit: int,
+        order_by: str,
+        filters: dict | list[BinaryExpression],
+        relationships: list | None = None,
+    ) -> tuple[list[T], int]:
+        # Page and total in one round trip: a window count over the filtered
+        # rows, or planner statistics for big unfiltered tables
+        offset_value = page * limit - limit
+        estimate = self.estimate_total and not filters
+        total_column = (
+            self.get_estimated_total() if estimate else func.count().over()
+        )
+        async with self.session() as session:
+            query = (
+                select(self.model, total_column.label('total'))
+                .offset(offset_value)
+                .limit(limit)
+                .order_by(
+                    *self.get_search_ranking(filters),
+                    *self.get_ordering(order_by),
+                )
+            )
+            query = self.apply_filters(query, filters)
+            query = self.add_joined_loads(query, relationships)
+
+            res = await session.execute(query)
+            rows = res.unique().all()
+
+        entities = [row[0] for row in rows]
+        total = rows[0].total if rows else None
 
+        # Either the page is past the end or the table was never analyzed
+        if total is None and (page > 1 or estimate):
+            total = await self.count_records(filters)
+        return entities, total or 0
+
+    @orm_errors_handler
+    async def find_many_by_cursor(
+        self,
+        cursor: str | None,
+        limit: int,
+        order_by: str,
+        filters: dict | list[BinaryExpression],
+        relationships: list | None = None,
+    ) -> list[T]:
+        async with self.session() as session:
+            query = (
+                select(self.model)
+                .limit(limit)
+                .order_by(*self.get_ordering(order_by))
+            )
+            if cursor:
+                order_column = self.get_order_column(order_by)
+                value, id_ = decode_cursor(cursor, order_column)
+                query = query.where(
+                    self.get_seek_expression(order_column, value, id_)
+                )
+            query = self.apply_filters(query, filters)
             query = self.add_joined_loads(query, relationships)
 
             res = await session.execute(query)
@@ -148,70 +382,159 @@ class SQLAlchemyRepository(AbstractRepository[T]):
 
     @orm_errors_handler
     async def count_records(self, filters: dict) -> int:
-        async with async_session_maker() as session:
+        async with self.session() as session:
             query = select(func.count()).select_from(self.model)
-
-            if filters:
-                expressions = self.get_expressions(filters)
-                query = query.where(and_(*expressions))
+            query = self.apply_filters(query, filters)
 
             res = await session.execute(query)
             return res.scalar_one()
 
     @orm_errors_handler
-    async def change_one(self, id: int, data: dict) -> T:
-        async with async_session_maker() as session:
-            stmt = (
-                update(self.model)
-                .values(**data)
-                .where(self.model.id == id)
-                .returning(self.model)
-            )
-            res = await session.execute(stmt)
-            await session.commit()
-
-            model = res.scalar()
-            return await self.find_one(model.id)
+    async def change_one(
+        self, id: int, data: dict, relationships: list | None = None
+    ) -> T:
+        return await self.update_returning(
+            self.model.id == id, data, relationships
+        )
 
     @orm_errors_handler
     async def change_one_by_custom_field(
-        self, custom_field: str, custom_value: str | int, data: dict
+        self,
+        custom_field: str,
+        custom_value: str | int,
+        data: dict,
+        relationships: list | None = None,
     ) -> T:
         column: orm.MappedColumn = getattr(self.model, custom_field)
-        async with async_session_maker() as session:
-            stmt = (
-                update(self.model)
-                .values(**data)
-                .where(column == custom_value)
-                .returning(self.model)
+        return await self.update_returning(
+            column == custom_value, data, relationships
+        )
+
+    async def update_returning(
+        self,
+        whereclause: ColumnElement[bool],
+        data: dict,
+        relationships: list | None = None,
+    ) -> T:
+        # UPDATE ... RETURNING wrapped in a CTE, so the updated row and its
+        # eager loaded relationships come back from the same statement
+        updated = (
+            update(self.model)
+            .values(**data)
+            .where(whereclause)
+            .returning(*self.model.__table__.columns)
+            .cte('updated')
+        )
+        updated_model = orm.aliased(self.model, updated)
+
+        async with self.transaction() as session:
+            query = select(updated_model).execution_options(
+                populate_existing=True
+            )
+            query = self.add_joined_loads(
+                query, relationships, entity=updated_model
             )
-            res = await session.execute(stmt)
-            await session.commit()
-            model = res.scalar()
-            return await self.find_one(model.id)
+
+            res = await session.execute(query)
+            return res.unique().scalars().first()
 
     @orm_errors_handler
     async def delete_one(self, id: int) -> T:
-        async with async_session_maker() as session:
+        async with self.transaction() as session:
             stmt = (
                 delete(self.model)
                 .where(self.model.id == id)
                 .returning(self.model)
             )
             res = await session.execute(stmt)
-            await session.commit()
             return res.scalar()
 
     def add_joined_loads(
-        self, query: Select, relationships: list[QueryableAttribute]
+        self,
+        query: Select,
+        relationships: list[QueryableAttribute],
+        entity: AliasedClass | None = None,
     ) -> Select:
         if not relationships:
             return query
+        if entity is not None:
+            relationships = [
+                getattr(entity, relationship.key)
+                for relationship in relationships
+            ]
         joined_loads = [
             orm.joinedload(relationship) for relationship in relationships
         ]
         return query.options(*joined_loads)
 
+    def get_conflict_columns(self) -> list[str]:
+        unique_constraints = sorted(
+            [column.name for column in constraint.columns]
+            for constraint in self.model.__table__.constraints
+            if isinstance(constraint, UniqueConstraint)
+        )
+        if not unique_constraints:
+            msg = f'{self.model.__tablename__} has no unique constraint'
+            raise ValueError(msg)
+        return unique_constraints[0]
+
+    def get_order_column(self, order_by: str) -> InstrumentedAttribute:
+        return getattr(self.model, getattr(order_by, 'value', order_by))
+
+    def get_ordering(self, order_by: str) -> tuple[InstrumentedAttribute, ...]:
+        order_column = self.get_order_column(order_by)
+        if order_column.key == 'id':
+            return (order_column,)
+        # id makes the order total, so pages and cursors never skip rows
+        return order_column, self.model.id
+
+    def get_search_ranking(
+        self, filters: dict | list[BinaryExpression]
+    ) -> list[ColumnElement]:
+        # Only pages are ranked, cursors seek by the requested order alone
+        if not isinstance(filters, dict):
+            return []
+        ranking = []
+        for key, value in filters.items():
+            column_name, op = parse_filter_key(key)
+            if op is FilterOp.LIKE:
+                column = getattr(self.model, column_name)
+                ranking.extend(self.search_backend.get_ranking(column, value))
+        return ranking
+
+    def get_seek_expression(
+        self, order_column: InstrumentedAttribute, value: Any, id_: int
+    ) -> ColumnElement[bool]:
+        # Postgres sorts NULLs last in ascending order
+        if value is None:
+            return and_(order_column.is_(None), self.model.id > id_)
+        if order_column.key == 'id':
+            return self.model.id > id_
+
+        expression = tuple_(order_column, self.model.id) > tuple_(value, id_)
+        if order_column.expression.nullable:
+            return or_(expression, order_column.is_(None))
+        return expression
+
+    def apply_filters(
+        self, query: Select, filters: dict | list[BinaryExpression]
+    ) -> Select:
+        if not filters:
+            return query
+        expressions = self.get_expressions(filters)
+        return query.where(and_(*expressions))
+
+    def get_estimated_total(self) -> ScalarSelect:
+        pg_class = table('pg_class', column('oid'), column('reltuples'))
+        return (
+            select(cast(pg_class.c.reltuples, BigInteger))
+            .where(
+                pg_class.c.oid == func.to_regclass(self.model.__tablename__),
+                pg_class.c.reltuples >= 0,
+            )
+            .scalar_subquery()
+        )
+
     def get_expressions(
         self, filters: dict[str, str | int] | list[BinaryExpression]
     ) -> list[BinaryExpression]:
@@ -219,14 +542,15 @@ class SQLAlchemyRepository(AbstractRepository[T]):
             filters[0], BinaryExpression
         ):
             return filters
-        expressions = []
-        for k, v in filters.items():
-            if k.endswith('_like'):
-                column: orm.MappedColumn = getattr(
-                    self.model, k.split('_like')[0]
-                )
-                expressions.append(column.ilike(f'%{v}%'))
-            else:
-                column: orm.MappedColumn = getattr(self.model, k)
-                expressions.append(column == v)
-        return expressions
+        return [self.get_filter(key)(value) for key, value in filters.items()]
+
+    def get_filter(self, key: str) -> Expression:
+        # Keys are resolved to columns once per repository class
+        compiled = self.compiled_filters.get(key)
+        if compiled is None:
+            column_name, op = parse_filter_key(key)
+            compiled = compile_filter(
+                getattr(self.model, column_name), op, self.search_backend
+            )
+            self.compiled_filters[key] = compiled
+        return compiled
@@ -7,12 +7,15 @@ from car_wash.auth.dependencies import (
     get_user_client,
     get_validate_access_to_entity,
 )
+from car_wash.database import get_unit_of_work
 from car_wash.utils.service import GenericCRUDService
 
 CLIENT = 'Allowed to client or admin'
 OWNER = 'Allowed to owner or admin'
 ADMIN = 'Allowed to admin only'
 
+UPSERT = 'Update records that already exist instead of failing'
+
 
 class CustomRouter(APIRouter):
     def __init__(
@@ -41,7 +44,7 @@ def get_client_router(prefix: str, tags: list[str]) -> CustomRouter:
         prefix=prefix,
         tags=tags,
         default_description=CLIENT,
-        dependencies=[Depends(get_user_client)],
+        dependencies=[Depends(get_unit_of_work), Depends(get_user_client)],
     )
 
 
@@ -52,7 +55,10 @@ def get_owner_router(
         prefix=prefix,
         tags=tags,
         default_description=OWNER,
-        dependencies=[Depends(get_validate_access_to_entity(service))],
+        dependencies=[
+            Depends(get_unit_of_work),
+            Depends(get_validate_access_to_entity(service)),
+        ],
     )
 
 
@@ -61,5 +67,5 @@ def get_admin_router(prefix: str, tags: list[str]) -> CustomRouter:
         prefix=prefix,
         tags=tags,
         default_description=ADMIN,
-        dependencies=[Depends(get_user_admin)],
+        dependencies=[Depends(get_unit_of_work), Depends(get_user_admin)],
     )
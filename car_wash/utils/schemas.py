@@ -1,7 +1,11 @@
+from typing import Any, ClassVar
+
 from pydantic import BaseModel, Field, computed_field
 from sqlalchemy import TableClause
 from sqlalchemy.orm import Mapped
 
+from car_wash.utils.filters import get_filter_spec
+
 
 class AnyModel(TableClause):
     __tablename__ = 'any_model'
@@ -12,19 +16,47 @@ class AnyModel(TableClause):
 class GenericListRequest(BaseModel):
     page: int = Field(default=1, ge=1)
     limit: int = Field(default=10, ge=1)
+    cursor: str | None = Field(
+        default=None,
+        description='next_cursor from a previous response, '
+        'takes precedence over page',
+    )
+
+    # Resolved once per schema when the class is created
+    filter_spec: ClassVar[dict[str, str]] = {}
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        cls.filter_spec = get_filter_spec(
+            cls, skip={'page', 'limit', 'cursor', 'order_by'}
+        )
+
+    def get_filters(self) -> dict[str, Any]:
+        filters = {}
+        for name, key in self.filter_spec.items():
+            value = getattr(self, name)
+            if value is not None:
+                filters[key] = value
+        return filters
 
 
 class GenericListResponse(BaseModel):
     data: list
-    total: int
-    current: int
+    total: int | None = None
+    current: int | None = None
+    next_cursor: str | None = None
 
     @computed_field
     @property
     def previous(self) -> int | None:
+        if self.current is None:
+            return None
         return self.current - 1 if self.current > 1 else None
 
     @computed_field
     @property
     def next(self) -> int | None:
+        if self.current is None:
+            return None
         return self.current + 1 if self.current != self.total else None
@@ -0,0 +1,73 @@
+from abc import ABC, abstractmethod
+
+from sqlalchemy import ColumnElement, Index, func, text
+from sqlalchemy.orm import InstrumentedAttribute
+
+# pg_trgm extracts no trigrams from shorter values, so they are matched
+# by prefix with a B-tree instead
+MIN_TRIGRAM_LENGTH = 3
+
+
+class SearchBackend(ABC):
+    @abstractmethod
+    def get_expression(
+        self, column: InstrumentedAttribute, value: str
+    ) -> ColumnElement[bool]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_ranking(
+        self, column: InstrumentedAttribute, value: str
+    ) -> list[ColumnElement]:
+        raise NotImplementedError
+
+
+# Plain substring match, fine for small tables
+class SubstringSearch(SearchBackend):
+    def get_expression(
+        self, column: InstrumentedAttribute, value: str
+    ) -> ColumnElement[bool]:
+        return column.ilike(f'%{value}%')
+
+    def get_ranking(
+        self,
+        column: InstrumentedAttribute,  # noqa: ARG002
+        value: str,  # noqa: ARG002
+    ) -> list[ColumnElement]:
+        return []
+
+
+# Needs the indexes from get_search_indexes on the searched column
+class TrigramSearch(SearchBackend):
+    def get_expression(
+        self, column: InstrumentedAttribute, value: str
+    ) -> ColumnElement[bool]:
+        if len(value) < MIN_TRIGRAM_LENGTH:
+            return func.lower(column).like(f'{value.lower()}%')
+        return column.ilike(f'%{value}%')
+
+    def get_ranking(
+        self, column: InstrumentedAttribute, value: str
+    ) -> list[ColumnElement]:
+        if len(value) < MIN_TRIGRAM_LENGTH:
+            return []
+        # Prefix matches first, then the closest names
+        return [
+            func.lower(column).like(f'{value.lower()}%').desc(),
+            func.similarity(column, value).desc(),
+        ]
+
+
+def get_search_indexes(prefix: str, column_name: str) -> tuple[Index, Index]:
+    return (
+        Index(
+            f'{prefix}__{column_name}_trgm',
+            column_name,
+            postgresql_using='gin',
+            postgresql_ops={column_name: 'gin_trgm_ops'},
+        ),
+        Index(
+            f'{prefix}__lower_{column_name}',
+            text(f'lower({column_name}) text_pattern_ops'),
+        ),
+    )
@@ -1,23 +1,49 @@
-from typing import Generic
+from typing import Any, ClassVar, Generic
 
 from fastapi import HTTPException
 from pydantic import BaseModel
+from sqlalchemy import inspect
 
+from car_wash.config import config
+from car_wash.database import run_after_commit
+from car_wash.utils.cache import (
+    cache,
+    dump_cache_value,
+    load_cache_value,
+    make_cache_key,
+)
+from car_wash.utils.pagination import encode_cursor
 from car_wash.utils.repository import SQLAlchemyRepository, T
 from car_wash.utils.schemas import GenericListRequest, GenericListResponse
 
 
-class GenericCRUDService(Generic[T]):
+# Services keep no per-request state, so every class is instantiated once
+# and the instance is shared by all requests
+class SingletonMeta(type):
+    instances: ClassVar[dict[type, Any]] = {}
+
+    def __call__(cls) -> Any:
+        if cls not in SingletonMeta.instances:
+            SingletonMeta.instances[cls] = super().__call__()
+        return SingletonMeta.instances[cls]
+
+
+class GenericCRUDService(Generic[T], metaclass=SingletonMeta):
     repository: type[SQLAlchemyRepository]
 
     def __init__(self):
         self.crud_repo: SQLAlchemyRepository = self.repository()
 
     async def create_entities(
-        self, new_entity: BaseModel | list[BaseModel]
+        self,
+        new_entity: BaseModel | list[BaseModel],
+        *,
+        upsert: bool = False,
     ) -> int | list[int]:
         if isinstance(new_entity, list):
             entities_dict = [entity.model_dump() for entity in new_entity]
+            if upsert:
+                return await self.crud_repo.upsert_many(entities_dict)
             entity_ids = await self.crud_repo.add_many(entities_dict)
             return entity_ids
         entities_dict = new_entity.model_dump()
@@ -33,20 +59,61 @@ class GenericCRUDService(Generic[T]):
     async def paginate_entities(
         self, query: GenericListRequest
     ) -> GenericListResponse:
-        query = query.model_dump()
-        page, limit, order_by = (
-            query.pop('page'),
-            query.pop('limit'),
-            query.pop('order_by'),
+        return await self.paginate(
+            query.page,
+            query.limit,
+            query.order_by,
+            query.get_filters(),
+            query.cursor,
         )
-        filters = {k: v for k, v in query.items() if v is not None}
 
-        entities = await self.crud_repo.find_many(
+    async def paginate(
+        self,
+        page: int,
+        limit: int,
+        order_by: str,
+        filters: dict,
+        cursor: str | None = None,
+    ) -> GenericListResponse:
+        if cursor is not None:
+            return await self.paginate_by_cursor(
+                cursor, limit, order_by, filters
+            )
+
+        entities, total_records = await self.crud_repo.find_many_with_total(
             page, limit, order_by, filters
         )
-        total_records = await self.crud_repo.count_records(filters)
         pages = (total_records + limit - 1) // limit
-        return GenericListResponse(data=entities, total=pages, current=page)
+        # Cursors seek by the requested order alone, so a page ordered by
+        # search rank can not be continued with one
+        ranked = bool(self.crud_repo.get_search_ranking(filters))
+        next_cursor = (
+            self.get_next_cursor(entities, order_by)
+            if page < pages and not ranked
+            else None
+        )
+        return GenericListResponse(
+            data=entities, total=pages, current=page, next_cursor=next_cursor
+        )
+
+    async def paginate_by_cursor(
+        self, cursor: str, limit: int, order_by: str, filters: dict
+    ) -> GenericListResponse:
+        # One extra row tells whether there is anything after this page
+        entities = await self.crud_repo.find_many_by_cursor(
+            cursor, limit + 1, order_by, filters
+        )
+        entities, has_more = entities[:limit], len(entities) > limit
+        next_cursor = (
+            self.get_next_cursor(entities, order_by) if has_more else None
+        )
+        return GenericListResponse(data=entities, next_cursor=next_cursor)
+
+    def get_next_cursor(self, entities: list[T], order_by: str) -> str | None:
+        if not entities:
+            return None
+        order_column = self.crud_repo.get_order_column(order_by)
+        return encode_cursor(order_column, entities[-1])
 
     async def update_entity(self, id: int, new_values: BaseModel) -> T:
         new_values_dict = new_values.model_dump(exclude_none=True)
@@ -60,3 +127,94 @@ class GenericCRUDService(Generic[T]):
         if id_ is None:
             raise HTTPException(status_code=404)
         return id_
+
+
+# Read-through cache for rarely changing tables. Cached results are keyed by
+# table version, so any write makes all of them unreachable at once
+class CachedCRUDService(GenericCRUDService[T]):
+    cache_ttl: int = config.cache_ttl
+
+    @property
+    def namespace(self) -> str:
+        return self.crud_repo.model.__tablename__
+
+    async def read_entity(self, id: int) -> dict:
+        version = await cache.get_version(self.namespace)
+        if version is None:
+            return self.to_dict(await super().read_entity(id))
+
+        key = make_cache_key(self.namespace, version, 'read', id)
+        cached = await cache.get(key)
+        if cached is not None:
+            return load_cache_value(cached)
+
+        entity = self.to_dict(await super().read_entity(id))
+        await cache.set(key, dump_cache_value(entity), self.cache_ttl)
+        return entity
+
+    async def paginate(
+        self,
+        page: int,
+        limit: int,
+        order_by: str,
+        filters: dict,
+        cursor: str | None = None,
+    ) -> GenericListResponse:
+        version = await cache.get_version(self.namespace)
+        if version is None:
+            return await super().paginate(
+                page, limit, order_by, filters, cursor
+            )
+
+        key = make_cache_key(
+            self.namespace,
+            version,
+            'list',
+            # Page number is irrelevant once cursor is given
+            None if cursor else page,
+            limit,
+            order_by,
+            sorted(filters.items()),
+            cursor,
+        )
+        cached = await cache.get(key)
+        if cached is not None:
+            return GenericListResponse.model_validate(load_cache_value(cached))
+
+        response = await super().paginate(
+            page, limit, order_by, filters, cursor
+        )
+        response.data = [self.to_dict(entity) for entity in response.data]
+        value = response.model_dump(mode='json', exclude={'previous', 'next'})
+        await cache.set(key, dump_cache_value(value), self.cache_ttl)
+        return response
+
+    async def create_entities(
+        self,
+        new_entity: BaseModel | list[BaseModel],
+        *,
+        upsert: bool = False,
+    ) -> int | list[int]:
+        entity_ids = await super().create_entities(new_entity, upsert=upsert)
+        await run_after_commit(self.invalidate_cache)
+        return entity_ids
+
+    async def update_entity(self, id: int, new_values: BaseModel) -> T:
+        updated_entity = await super().update_entity(id, new_values)
+        await run_after_commit(self.invalidate_cache)
+        return updated_entity
+
+    async def delete_entity(self, id: int) -> int:
+        id_ = await super().delete_entity(id)
+        await run_after_commit(self.invalidate_cache)
+        return id_
+
+    async def invalidate_cache(self) -> None:
+        await cache.bump_version(self.namespace)
+
+    @staticmethod
+    def to_dict(entity: T) -> dict:
+        return {
+            attr.key: getattr(entity, attr.key)
+            for attr in inspect(entity).mapper.column_attrs
+        }
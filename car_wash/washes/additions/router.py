@@ -1,8 +1,12 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
-from car_wash.utils.routers import get_admin_router, get_client_router
+from car_wash.utils.routers import (
+    UPSERT,
+    get_admin_router,
+    get_client_router,
+)
 from car_wash.washes.additions import schemas
 from car_wash.washes.additions.service import CarWashAdditionService
 
@@ -19,8 +23,14 @@ async def create_addition(new_prices: schemas.CarWashAdditionCreate):
 
 
 @admin_router.post('/bulk', response_model=schemas.CreateBulkResponse)
-async def create_additions(new_prices: list[schemas.CarWashAdditionCreate]):
-    addition_ids = await CarWashAdditionService().create_entities(new_prices)
+async def create_additions(
+    new_prices: list[schemas.CarWashAdditionCreate],
+    *,
+    upsert: Annotated[bool, Query(description=UPSERT)] = False,
+):
+    addition_ids = await CarWashAdditionService().create_entities(
+        new_prices, upsert=upsert
+    )
     return {'car_wash_addition_ids': addition_ids}
 
 
@@ -0,0 +1,120 @@
+import bisect
+import re
+from collections.abc import Iterable, Sequence
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple, Protocol
+
+# Functions here only read their arguments, so they can be called from any
+# number of concurrent requests
+
+Slot = tuple[datetime, datetime]
+
+MIN_DURATION = timedelta(hours=2)
+
+# Shared offsets, so slots do not build a timedelta for every minute
+MINUTES = [timedelta(minutes=minute) for minute in range(24 * 60 + 1)]
+
+
+class DayScheduleRow(Protocol):
+    # All None when the car wash is closed that day
+    start_time: time | None
+    end_time: time | None
+    occupied: str | None
+
+
+class AvailabilityRow(Protocol):
+    day: date
+    box_id: int
+    start_time: time
+    end_time: time
+    occupied: str | None
+
+
+# Standalone AvailabilityRow for callers that have no query result at hand
+class FreeSlotsRow(NamedTuple):
+    day: date
+    box_id: int
+    start_time: time
+    end_time: time
+    occupied: str | None
+
+
+def get_free_slots(
+    day: date,
+    start_time: time,
+    end_time: time,
+    occupied: str | None,
+    min_duration: timedelta = MIN_DURATION,
+) -> list[Slot]:
+    row = FreeSlotsRow(day, 0, start_time, end_time, occupied)
+    return compute_free_slots([row], min_duration)[0]
+
+
+def compute_free_slots(
+    rows: Sequence[AvailabilityRow], min_duration: timedelta = MIN_DURATION
+) -> list[list[Slot]]:
+    slots = [[] for _ in rows]
+    # Schedule windows with bookings, joined by an occupied minute so a
+    # single scan finds the free runs of all of them
+    windows = []
+    window_rows = []
+    window_starts = []
+    window_offsets = []
+    offset = 0
+    for index, row in enumerate(rows):
+        start_minute = row.start_time.hour * 60 + row.start_time.minute
+        end_minute = row.end_time.hour * 60 + row.end_time.minute
+        window = (row.occupied or '')[start_minute:end_minute]
+
+        # If there are no bookings for this box, the entire schedule is
+        # available
+        if '1' not in window:
+            slots[index].append(
+                (
+                    datetime.combine(row.day, row.start_time),
+                    datetime.combine(row.day, row.end_time),
+                )
+            )
+            continue
+
+        windows.append(window)
+        window_rows.append(index)
+        window_starts.append(offset)
+        # Position in the joined windows minus the minute of the day
+        window_offsets.append(offset - start_minute)
+        offset += len(window) + 1
+
+    # Runs of free minutes long enough to fit a booking
+    min_minutes = min_duration // timedelta(minutes=1)
+    day_starts = [
+        datetime.combine(rows[index].day, time.min) for index in window_rows
+    ]
+    for match in re.finditer(f'0{{{min_minutes},}}', '1'.join(windows)):
+        window = bisect.bisect_right(window_starts, match.start()) - 1
+        day_start = day_starts[window]
+        slots[window_rows[window]].append(
+            (
+                day_start + MINUTES[match.start() - window_offsets[window]],
+                day_start + MINUTES[match.end() - window_offsets[window]],
+            )
+        )
+    return slots
+
+
+def group_free_slots(
+    rows: Sequence[AvailabilityRow], min_duration: timedelta = MIN_DURATION
+) -> dict[date, dict[int, list[Slot]]]:
+    slots_by_day = {}
+    free_slots = compute_free_slots(rows, min_duration)
+    for row, row_slots in zip(rows, free_slots, strict=True):
+        slots_by_day.setdefault(row.day, {})[row.box_id] = row_slots
+    return slots_by_day
+
+
+def fits_in_free_slots(
+    slots: Iterable[Slot], start_datetime: datetime, end_datetime: datetime
+) -> bool:
+    return any(
+        slot_start <= start_datetime and slot_end >= end_datetime
+        for slot_start, slot_end in slots
+    )
@@ -0,0 +1,113 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    ScalarSelect,
+    cast,
+    extract,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import BIT
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from car_wash.utils.exception_handling import orm_errors_handler
+from car_wash.utils.repository import SQLAlchemyRepository
+from car_wash.washes.bookings.schemas import StateEnum
+from car_wash.washes.models import MINUTES_IN_DAY, Booking, BoxAvailability
+
+
+class BoxAvailabilityRepository(SQLAlchemyRepository[BoxAvailability]):
+    model = BoxAvailability
+    # refresh returns nothing, that is not a missing row
+    raise_404_when_find_one_not_found = False
+
+    @orm_errors_handler
+    async def refresh(
+        self, box_id: int, start_datetime: datetime, end_datetime: datetime
+    ) -> None:
+        async with self.transaction() as session:
+            for day in self.get_days(start_datetime, end_datetime):
+                # Row lock makes concurrent refreshes of the same day run one
+                # after another, so the recount always sees their bookings
+                await session.execute(
+                    pg_insert(self.model)
+                    .values(box_id=box_id, day=day, occupied=self.empty_day())
+                    .on_conflict_do_update(
+                        index_elements=['box_id', 'day'],
+                        set_={'box_id': box_id},
+                    )
+                )
+                await session.execute(
+                    update(self.model)
+                    .where(
+                        self.model.box_id == box_id,
+                        self.model.day == day,
+                    )
+                    .values(occupied=self.get_occupied_bitmap(box_id, day))
+                )
+
+    def get_occupied_bitmap(self, box_id: int, day: date) -> ScalarSelect:
+        day_start = datetime.combine(day, time.min)
+        day_end = day_start + timedelta(days=1)
+
+        # Partially taken minutes count as taken
+        start = cast(
+            func.greatest(
+                func.floor(self.to_minutes(Booking.start_datetime, day_start)),
+                0,
+            ),
+            Integer,
+        )
+        end = cast(
+            func.least(
+                func.ceil(self.to_minutes(Booking.end_datetime, day_start)),
+                MINUTES_IN_DAY,
+            ),
+            Integer,
+        )
+        mask = cast(
+            func.concat(
+                func.repeat('0', start),
+                func.repeat('1', end - start),
+                func.repeat('0', MINUTES_IN_DAY - end),
+            ),
+            BIT(MINUTES_IN_DAY),
+        )
+
+        return (
+            select(func.coalesce(func.bit_or(mask), self.empty_day()))
+            .where(
+                Booking.box_id == box_id,
+                Booking.state != StateEnum.EXCEPTION.value,
+                Booking.start_datetime < day_end,
+                Booking.end_datetime > day_start,
+            )
+            .scalar_subquery()
+        )
+
+    @staticmethod
+    def to_minutes(
+        value: ColumnElement[datetime], day_start: datetime
+    ) -> ColumnElement[float]:
+        return extract('epoch', value - day_start) / 60
+
+    @staticmethod
+    def empty_day() -> ColumnElement[str]:
+        return cast(func.repeat('0', MINUTES_IN_DAY), BIT(MINUTES_IN_DAY))
+
+    @staticmethod
+    def get_days(
+        start_datetime: datetime, end_datetime: datetime
+    ) -> list[date]:
+        last_day = max(
+            end_datetime - timedelta(microseconds=1), start_datetime
+        )
+        return [
+            start_datetime.date() + timedelta(days=offset)
+            for offset in range(
+                (last_day.date() - start_datetime.date()).days + 1
+            )
+        ]
@@ -1,42 +1,123 @@
-from sqlalchemy import BinaryExpression, and_, select
+from datetime import date
+from decimal import Decimal
+from typing import Protocol
 
-from car_wash.database import async_session_maker
+from sqlalchemy import BinaryExpression, Select, Text, and_, cast, func, select
+from sqlalchemy.orm import aliased
+
+from car_wash.cars.models import CarBodyType, CarConfiguration, UserCar
 from car_wash.utils.exception_handling import orm_errors_handler
 from car_wash.utils.repository import SQLAlchemyRepository
-from car_wash.washes.models import Booking, Box
+from car_wash.washes.availability.engine import DayScheduleRow
+from car_wash.washes.exceptions import BookingIsNotAvailableError
+from car_wash.washes.models import (
+    Booking,
+    Box,
+    BoxAvailability,
+    CarWashAddition,
+    CarWashPrice,
+    Schedule,
+)
+
+
+class BookingPricingProtocol(DayScheduleRow, Protocol):
+    car_wash_id: int
+    body_type_id: int
+    price: Decimal | None
+    addition: CarWashAddition | None
 
 
 class BookingRepository(SQLAlchemyRepository[Booking]):
     model = Booking
+    estimate_total = True
+    exclusion_error = BookingIsNotAvailableError
+
+    def apply_filters(
+        self, query: Select, filters: dict | list[BinaryExpression]
+    ) -> Select:
+        if isinstance(filters, dict) and 'car_wash_id' in filters:
+            filters = filters.copy()
+            query = query.join(self.model.box).where(
+                Box.car_wash_id == filters.pop('car_wash_id')
+            )
+        if isinstance(filters, dict) and 'user_id' in filters:
+            filters = filters.copy()
+            query = query.join(self.model.user_car).where(
+                UserCar.user_id == filters.pop('user_id')
+            )
+        return super().apply_filters(query, filters)
 
     @orm_errors_handler
-    async def find_many(
+    async def fetch_pricing(
         self,
-        page: int,
-        limit: int,
-        order_by: str,
-        filters: dict | list[BinaryExpression],
-        relationships: list | None = None,
-    ) -> list[Booking]:
-        offset_value = page * limit - limit
-        async with async_session_maker() as session:
-            query = (
-                select(self.model)
-                .offset(offset_value)
-                .limit(limit)
-                .order_by(order_by)
-            )
+        box_id: int,
+        user_car_id: int,
+        day: date,
+        addition_ids: list[int] | None = None,
+    ) -> list[BookingPricingProtocol]:
+        # One row per requested addition, or a single one without them.
+        # No rows at all when the box or the user car does not exist
+        own_price = aliased(CarWashPrice)
+        parent_price = aliased(CarWashPrice)
+        addition = aliased(CarWashAddition, name='addition')
 
-            if 'car_wash_id' in filters:
-                query = query.join(self.model.box).where(
-                    Box.car_wash_id == filters.pop('car_wash_id')
+        async with self.session() as session:
+            query = (
+                select(
+                    Box.car_wash_id,
+                    CarConfiguration.body_type_id,
+                    # Price of the body type itself, otherwise the parent's
+                    func.coalesce(own_price.price, parent_price.price).label(
+                        'price'
+                    ),
+                    Schedule.start_time,
+                    Schedule.end_time,
+                    cast(BoxAvailability.occupied, Text).label('occupied'),
+                    addition,
                 )
-
-            if filters:
-                expressions = self.get_expressions(filters)
-                query = query.where(and_(*expressions))
-
-            query = self.add_joined_loads(query, relationships)
-
+                .select_from(Box)
+                .join(UserCar, UserCar.id == user_car_id)
+                .join(
+                    CarConfiguration,
+                    CarConfiguration.id == UserCar.configuration_id,
+                )
+                .join(
+                    CarBodyType,
+                    CarBodyType.id == CarConfiguration.body_type_id,
+                )
+                .outerjoin(
+                    own_price,
+                    and_(
+                        own_price.car_wash_id == Box.car_wash_id,
+                        own_price.body_type_id == CarBodyType.id,
+                    ),
+                )
+                .outerjoin(
+                    parent_price,
+                    and_(
+                        parent_price.car_wash_id == Box.car_wash_id,
+                        parent_price.body_type_id == CarBodyType.parent_id,
+                    ),
+                )
+                .outerjoin(
+                    Schedule,
+                    and_(
+                        Schedule.car_wash_id == Box.car_wash_id,
+                        # Both count from Monday = 0
+                        Schedule.day_of_week == day.weekday(),
+                        Schedule.is_available.is_(True),
+                    ),
+                )
+                .outerjoin(
+                    BoxAvailability,
+                    and_(
+                        BoxAvailability.box_id == Box.id,
+                        BoxAvailability.day == day,
+                    ),
+                )
+                .outerjoin(addition, addition.id.in_(addition_ids or []))
+                .where(Box.id == box_id)
+                .order_by(addition.id)
+            )
             res = await session.execute(query)
-            return res.unique().scalars().all()
+            return res.all()
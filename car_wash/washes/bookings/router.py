@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from car_wash.utils.routers import (
     get_admin_router,
@@ -32,7 +32,11 @@ async def read_booking(id: int):
 
 
 @client_router.get('', response_model=schemas.ListResponse)
-async def list_bookings(query: Annotated[schemas.BookingList, Depends()]):
+async def list_bookings(
+    params: Annotated[schemas.BookingListParams, Depends()],
+    state: Annotated[list[schemas.StateEnum] | None, Query()] = None,
+):
+    query = schemas.BookingList(**params.model_dump(), state=state)
     paginated_bookings = await BookingService().paginate_entities(query)
     return paginated_bookings
 
@@ -1,7 +1,7 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from enum import StrEnum, auto
-from typing import Any, Literal, Self
+from typing import Annotated, Any, Literal, Self
 
 from pydantic import (
     BaseModel,
@@ -13,6 +13,7 @@ from pydantic import (
 from pydantic.json_schema import SkipJsonSchema
 
 from car_wash.cars.schemas import UserCarRead
+from car_wash.utils.filters import Filter, FilterOp
 from car_wash.utils.schemas import GenericListRequest, GenericListResponse
 from car_wash.washes.additions.schemas import CarWashAdditionRead
 from car_wash.washes.boxes.schemas import BoxRead
@@ -109,12 +110,28 @@ class BookingRead(BaseModel):
         return data
 
 
-class BookingList(GenericListRequest):
+class BookingListParams(GenericListRequest):
     order_by: Literal['id', 'created_at', 'user_id', 'box_id'] = 'id'
     user_id: int | None = None
     box_id: int | None = None
     car_wash_id: int | None = None
 
+    start_from: Annotated[
+        datetime | None, Filter('start_datetime', FilterOp.GE)
+    ] = None
+    start_to: Annotated[
+        datetime | None, Filter('start_datetime', FilterOp.LT)
+    ] = None
+    day: Annotated[date | None, Filter('start_datetime', FilterOp.ON_DATE)] = (
+        Field(default=None, description='Bookings starting on this day')
+    )
+
+
+# A model dependency reads list fields from the body, so the router
+# takes the states as a query parameter of its own
+class BookingList(BookingListParams):
+    state: Annotated[list[StateEnum] | None, Filter(op=FilterOp.IN)] = None
+
 
 class BookingUpdate(BaseModel):
     state: StateEnum | None = Field(default=None)
@@ -1,14 +1,18 @@
-from car_wash.cars.body_types.repository import CarBodyTypeRepository
-from car_wash.cars.configurations.repository import CarConfigurationRepository
-from car_wash.cars.repository import UserCarRepository
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from car_wash.database import read_from_primary
 from car_wash.utils.service import GenericCRUDService
-from car_wash.washes.additions.service import CarWashAdditionService
+from car_wash.washes.additions.schemas import CarWashAdditionRead
+from car_wash.washes.availability.repository import BoxAvailabilityRepository
 from car_wash.washes.bookings.repository import BookingRepository
 from car_wash.washes.bookings.schemas import BookingCreate
-from car_wash.washes.boxes.repository import BoxRepository
-from car_wash.washes.exceptions import BookingIsNotAvailableError
+from car_wash.washes.exceptions import (
+    BookingIsNotAvailableError,
+    BookingPriceNotFoundError,
+    BoxOrUserCarNotFoundError,
+)
 from car_wash.washes.models import Booking
-from car_wash.washes.prices.repository import CarWashPriceRepository
 from car_wash.washes.service import CarWashService
 
 
@@ -18,64 +22,66 @@ class BookingService(GenericCRUDService[Booking]):
     def __init__(self):
         super().__init__()
         self.car_wash_service = CarWashService()
-        self.addition_service = CarWashAdditionService()
-        self.box_repo = BoxRepository()
-        self.price_repo = CarWashPriceRepository()
-        self.user_car_repo = UserCarRepository()
-        self.car_config_repo = CarConfigurationRepository()
-        self.car_body_type_repo = CarBodyTypeRepository()
+        self.availability_repo = BoxAvailabilityRepository()
 
     async def create_booking(self, new_booking: BookingCreate) -> int:
-        box = await self.box_repo.find_one(new_booking.box_id)
-
-        if not await self.car_wash_service.is_booking_possible(
-            box, new_booking
-        ):
-            raise BookingIsNotAvailableError
-
-        user_car = await self.user_car_repo.find_one(new_booking.user_car_id)
-        car_config = await self.car_config_repo.find_one(
-            user_car.configuration_id
-        )
-
-        price_model = self.price_repo.model
-        self.price_repo.raise_404_when_find_one_not_found = False
-        price_entity = await self.price_repo.find_one_by_custom_fields(
-            [
-                price_model.car_wash_id == box.car_wash_id,
-                price_model.body_type_id == car_config.body_type_id,
-            ]
-        )
-        self.price_repo.raise_404_when_find_one_not_found = True
-        if not price_entity:
-            body_type = await self.car_body_type_repo.find_one(
-                car_config.body_type_id
+        # Box, price, schedule and additions come in one statement.
+        # A lagging replica could miss a booking made a moment ago
+        with read_from_primary():
+            rows = await self.crud_repo.fetch_pricing(
+                new_booking.box_id,
+                new_booking.user_car_id,
+                new_booking.start_datetime.date(),
+                new_booking.addition_ids,
             )
-
-            price_entity = await self.price_repo.find_one_by_custom_fields(
-                [
-                    price_model.car_wash_id == box.car_wash_id,
-                    price_model.body_type_id == body_type.parent_id,
-                ]
+        if not rows:
+            raise BoxOrUserCarNotFoundError(
+                new_booking.box_id, new_booking.user_car_id
             )
+        pricing = rows[0]
+        if pricing.price is None:
+            raise BookingPriceNotFoundError
+        if not self.car_wash_service.is_booking_possible(new_booking, pricing):
+            raise BookingIsNotAvailableError
+        additions = [
+            CarWashAdditionRead.model_validate(row.addition)
+            for row in rows
+            if row.addition is not None
+        ]
 
-        new_booking.base_price = price_entity.price
-        new_booking.total_price = price_entity.price
-
-        if new_booking.addition_ids:
-            additions = await self.addition_service.read_by_ids(
-                new_booking.addition_ids
-            )
-
-            for addition in additions:
-                new_booking.total_price += addition.price
-
-            new_booking.additions = [
-                addition.model_dump_json() for addition in additions
-            ]
-        else:
-            new_booking.additions = []
+        new_booking.base_price = pricing.price
+        new_booking.total_price = pricing.price
+        for addition in additions:
+            new_booking.total_price += addition.price
+        new_booking.additions = [
+            addition.model_dump_json() for addition in additions
+        ]
 
         entity_dict = new_booking.model_dump()
         entity_id = await self.crud_repo.add_one(entity_dict)
+        await self.availability_repo.refresh(
+            new_booking.box_id,
+            new_booking.start_datetime,
+            new_booking.end_datetime,
+        )
         return entity_id
+
+    async def update_entity(self, id: int, new_values: BaseModel) -> Booking:
+        updated_booking = await super().update_entity(id, new_values)
+        # State may have changed to or from EXCEPTION
+        await self.availability_repo.refresh(
+            updated_booking.box_id,
+            updated_booking.start_datetime,
+            updated_booking.end_datetime,
+        )
+        return updated_booking
+
+    async def delete_entity(self, id: int) -> int:
+        booking = await self.crud_repo.delete_one(id)
+        if booking is None:
+            raise HTTPException(status_code=404)
+
+        await self.availability_repo.refresh(
+            booking.box_id, booking.start_datetime, booking.end_datetime
+        )
+        return booking.id
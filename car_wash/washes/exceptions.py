@@ -59,3 +59,35 @@ class BookingIsNotAvailableError(HTTPException):
             detail='Booking for these start_datetime and end_datetime '
             'is not available',
         )
+
+
+class BookingPriceNotFoundError(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=404,
+            detail='This car wash has no price for the body type of the car',
+        )
+
+
+class BoxOrUserCarNotFoundError(HTTPException):
+    def __init__(self, box_id: int, user_car_id: int):
+        super().__init__(
+            status_code=404,
+            detail=f'Box with id={box_id} or user car with '
+            f'id={user_car_id} not found',
+        )
+
+
+class DateFromGreaterError(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=422, detail='date_from have to be lower then date_to'
+        )
+
+
+class DateRangeTooLongError(HTTPException):
+    def __init__(self, max_days: int):
+        super().__init__(
+            status_code=422,
+            detail=f'Date range can not be longer than {max_days} days',
+        )
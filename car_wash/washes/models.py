@@ -1,14 +1,17 @@
-from datetime import datetime, time
+from datetime import date, datetime, time
 
 from sqlalchemy import (
     JSON,
     BigInteger,
     ForeignKey,
+    Index,
     Numeric,
     Text,
     UniqueConstraint,
     func,
+    text,
 )
+from sqlalchemy.dialects.postgresql import BIT, ExcludeConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from car_wash.cars.models import CarBodyType, UserCar
@@ -18,9 +21,18 @@ from car_wash.washes.locations.models import CarWashLocation
 
 metadata = Base.metadata
 
+MINUTES_IN_DAY = 24 * 60
+
 
 class CarWash(Base):
     __tablename__ = 'car_wash'
+    __table_args__ = (
+        Index(
+            'ix_car_wash___location_id',
+            'location_id',
+            postgresql_where=text('active'),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
@@ -28,7 +40,6 @@ class CarWash(Base):
     active: Mapped[bool]
 
     image_path: Mapped[str] = mapped_column(nullable=True)
-    image_link: Mapped[str] = mapped_column(nullable=True)
 
     location_id: Mapped[int] = mapped_column(
         ForeignKey(CarWashLocation.id, ondelete='RESTRICT')
@@ -80,6 +91,7 @@ class Schedule(Base):
 
 class Box(Base):
     __tablename__ = 'car_wash__box'
+    __table_args__ = (Index('ix_car_wash_box___car_wash_id', 'car_wash_id'),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
@@ -121,6 +133,29 @@ class Booking(Base):
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
 
+    # Bookings of a box can not overlap, whatever the order of concurrent
+    # inserts is. Cancelled ones keep their time but do not take the box
+    __table_args__ = (
+        ExcludeConstraint(
+            ('box_id', '='),
+            (text('tsrange(start_datetime, end_datetime)'), '&&'),
+            name='excl_car_wash_booking___box_id__time_range',
+            using='gist',
+            where="state <> 'EXCEPTION'",
+        ),
+        # Overlap lookups of the availability index
+        Index(
+            'ix_car_wash_booking___box_id__start_datetime__end_datetime',
+            'box_id',
+            'start_datetime',
+            'end_datetime',
+            postgresql_where=text("state <> 'EXCEPTION'"),
+        ),
+        # Listing bookings of a box in id order
+        Index('ix_car_wash_booking___box_id__id', 'box_id', 'id'),
+        Index('ix_car_wash_booking___user_car_id', 'user_car_id'),
+    )
+
     # Relationships
     user_car: Mapped['UserCar'] = relationship(
         'UserCar', back_populates='bookings', uselist=False, lazy='joined'
@@ -130,6 +165,18 @@ class Booking(Base):
     )
 
 
+# Bookings of a box squashed into one bit per minute of the day,
+# the bit is set when the minute is taken by any non-EXCEPTION booking
+class BoxAvailability(Base):
+    __tablename__ = 'car_wash__box_availability'
+
+    box_id: Mapped[int] = mapped_column(
+        ForeignKey(Box.id, ondelete='CASCADE'), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    occupied: Mapped[str] = mapped_column(BIT(MINUTES_IN_DAY))
+
+
 class CarWashPrice(Base):
     __tablename__ = 'car_wash__price'
     __table_args__ = (
@@ -138,6 +185,7 @@ class CarWashPrice(Base):
             'body_type_id',
             name='uix_car_wash_price___car_wash_id__body_type_id',
         ),
+        Index('ix_car_wash_price___body_type_id', 'body_type_id'),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
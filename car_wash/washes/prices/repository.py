@@ -1,6 +1,5 @@
 from sqlalchemy import select
 
-from car_wash.database import async_session_maker
 from car_wash.utils.repository import SQLAlchemyRepository
 from car_wash.washes.models import CarWashPrice
 
@@ -11,7 +10,7 @@ class CarWashPriceRepository(SQLAlchemyRepository[CarWashPrice]):
     async def select_body_types_from_price(
         self, car_wash_id: int
     ) -> list[int]:
-        async with async_session_maker() as session:
+        async with self.session() as session:
             query = select(self.model.body_type_id).where(
                 self.model.car_wash_id == car_wash_id
             )
@@ -1,8 +1,12 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
-from car_wash.utils.routers import get_admin_router, get_client_router
+from car_wash.utils.routers import (
+    UPSERT,
+    get_admin_router,
+    get_client_router,
+)
 from car_wash.washes.prices import schemas
 from car_wash.washes.prices.service import CarWashPriceService
 
@@ -19,8 +23,14 @@ async def create_price(new_prices: schemas.CarWashPriceCreate):
 
 
 @admin_router.post('/bulk', response_model=schemas.CreateBulkResponse)
-async def create_prices(new_prices: list[schemas.CarWashPriceCreate]):
-    price_ids = await CarWashPriceService().create_entities(new_prices)
+async def create_prices(
+    new_prices: list[schemas.CarWashPriceCreate],
+    *,
+    upsert: Annotated[bool, Query(description=UPSERT)] = False,
+):
+    price_ids = await CarWashPriceService().create_entities(
+        new_prices, upsert=upsert
+    )
     return {'car_wash_price_ids': price_ids}
 
 
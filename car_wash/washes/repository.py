@@ -1,79 +1,229 @@
 from datetime import date as dt
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 from typing import Protocol
 
-from sqlalchemy import and_, or_
+from sqlalchemy import (
+    ColumnElement,
+    Date,
+    DateTime,
+    Integer,
+    Subquery,
+    Text,
+    and_,
+    cast,
+    exists,
+    extract,
+    func,
+    literal,
+    or_,
+)
+from sqlalchemy.dialects.postgresql import BIT
 from sqlalchemy.future import select
 
-from car_wash.database import async_session_maker
+from car_wash.cars.models import CarBodyType
 from car_wash.utils.exception_handling import orm_errors_handler
 from car_wash.utils.repository import SQLAlchemyRepository
-from car_wash.washes.bookings.schemas import StateEnum
-from car_wash.washes.models import Booking, Box, CarWash, Schedule
+from car_wash.washes.availability.engine import AvailabilityRow
+from car_wash.washes.availability.repository import BoxAvailabilityRepository
+from car_wash.washes.locations.models import CarWashLocation
+from car_wash.washes.models import (
+    MINUTES_IN_DAY,
+    Box,
+    BoxAvailability,
+    CarWash,
+    CarWashPrice,
+    Schedule,
+)
 
 
-class RowProtocol(Protocol):
+class FreeSlotRowProtocol(Protocol):
+    car_wash_id: int
     box_id: int
-    start_time: time
-    end_time: time
-    start_datetime: datetime | None
-    end_datetime: datetime | None
-    previous_booking_end: datetime | None
+    day: dt
+    start_minute: int
 
 
 class CarWashRepository(SQLAlchemyRepository[CarWash]):
     model = CarWash
     schedule_model = Schedule
-    booking_model = Booking
 
     @orm_errors_handler
-    async def fetch_schedule_and_booking(
-        self, car_wash_id: int, date: dt
-    ) -> list[RowProtocol]:
-        day_of_week = date.weekday()
-        start_of_day = datetime.combine(date, time.min)
-        end_of_day = datetime.combine(date, time.max)
-
-        async with async_session_maker() as session:
+    async def fetch_schedule_and_availability(
+        self,
+        car_wash_id: int | None,
+        date_from: dt,
+        date_to: dt,
+        box_id: int | None = None,
+    ) -> list[AvailabilityRow]:
+        days = self.get_days_subquery(date_from, date_to)
+
+        async with self.session() as session:
             query = (
                 select(
+                    days.c.day,
                     Box.id.label('box_id'),
                     Schedule.start_time,
                     Schedule.end_time,
-                    Booking.start_datetime,
-                    Booking.end_datetime,
+                    cast(BoxAvailability.occupied, Text).label('occupied'),
                 )
                 .select_from(Box)
                 .join(Schedule, Schedule.car_wash_id == Box.car_wash_id)
+                .join(days, Schedule.day_of_week == days.c.day_of_week)
                 .outerjoin(
-                    Booking,
+                    BoxAvailability,
                     and_(
-                        Booking.box_id == Box.id,
-                        or_(
-                            Booking.start_datetime.between(
-                                start_of_day, end_of_day
-                            ),
-                            Booking.end_datetime.between(
-                                start_of_day, end_of_day
-                            ),
-                            and_(
-                                Booking.start_datetime <= start_of_day,
-                                Booking.end_datetime >= end_of_day,
-                            ),
-                        ),
-                    ),
-                )
-                .where(
-                    Schedule.car_wash_id == car_wash_id,
-                    Schedule.day_of_week == day_of_week,
-                    Schedule.is_available.is_(True),
-                    or_(
-                        Booking.id.is_(None),
-                        Booking.state != StateEnum.EXCEPTION.value,
+                        BoxAvailability.box_id == Box.id,
+                        BoxAvailability.day == days.c.day,
                     ),
                 )
-                .order_by(Box.id, Booking.start_datetime)
+                .where(Schedule.is_available.is_(True))
+                .order_by(days.c.day, Box.id)
+            )
+            if car_wash_id is not None:
+                query = query.where(Schedule.car_wash_id == car_wash_id)
+            if box_id is not None:
+                query = query.where(Box.id == box_id)
+
+            result = await session.execute(query)
+            return result.fetchall()
+
+    @orm_errors_handler
+    async def search_free_slots(
+        self,
+        city: str,
+        date_from: dt,
+        date_to: dt,
+        body_type_id: int,
+        duration: int,
+        not_before: datetime,
+        limit: int,
+    ) -> list[FreeSlotRowProtocol]:
+        days = self.get_days_subquery(date_from, date_to)
+
+        window_start = func.greatest(
+            self.to_minute_of_day(Schedule.start_time),
+            cast(
+                func.ceil(
+                    extract(
+                        'epoch',
+                        literal(not_before, DateTime) - days.c.day_start,
+                    )
+                    / 60
+                ),
+                Integer,
+            ),
+        )
+        window_end = self.to_minute_of_day(Schedule.end_time)
+
+        # Minutes outside of the schedule are as good as occupied
+        outside_window = cast(
+            func.concat(
+                func.repeat('1', window_start),
+                func.repeat('0', window_end - window_start),
+                func.repeat('1', MINUTES_IN_DAY - window_end),
+            ),
+            BIT(MINUTES_IN_DAY),
+        )
+        unavailable = func.coalesce(
+            BoxAvailability.occupied, BoxAvailabilityRepository.empty_day()
+        ).op('|', return_type=BIT(MINUTES_IN_DAY))(outside_window)
+
+        # 1-based index of the first run of free minutes, 0 when none
+        first_free = func.strpos(
+            cast(unavailable, Text), func.repeat('0', duration)
+        )
+
+        parent_body_type_id = (
+            select(CarBodyType.parent_id)
+            .where(CarBodyType.id == body_type_id)
+            .scalar_subquery()
+        )
+        has_price = exists().where(
+            CarWashPrice.car_wash_id == CarWash.id,
+            or_(
+                CarWashPrice.body_type_id == body_type_id,
+                CarWashPrice.body_type_id == parent_body_type_id,
+            ),
+        )
+
+        candidates = (
+            select(
+                CarWash.id.label('car_wash_id'),
+                Box.id.label('box_id'),
+                days.c.day,
+                (first_free - 1).label('start_minute'),
+            )
+            .select_from(CarWash)
+            .join(CarWashLocation, CarWashLocation.id == CarWash.location_id)
+            .join(Box, Box.car_wash_id == CarWash.id)
+            .join(Schedule, Schedule.car_wash_id == CarWash.id)
+            .join(days, Schedule.day_of_week == days.c.day_of_week)
+            .outerjoin(
+                BoxAvailability,
+                and_(
+                    BoxAvailability.box_id == Box.id,
+                    BoxAvailability.day == days.c.day,
+                ),
+            )
+            .where(
+                # Same predicate as the partial index on location_id
+                CarWash.active,
+                CarWashLocation.city == city,
+                Schedule.is_available.is_(True),
+                window_start + duration <= window_end,
+                has_price,
+            )
+            .subquery('candidates')
+        )
+
+        # Earliest slot of every car wash
+        earliest = (
+            select(candidates)
+            .where(candidates.c.start_minute >= 0)
+            .distinct(candidates.c.car_wash_id)
+            .order_by(
+                candidates.c.car_wash_id,
+                candidates.c.day,
+                candidates.c.start_minute,
+                candidates.c.box_id,
             )
+            .subquery('earliest')
+        )
 
+        async with self.session() as session:
+            query = (
+                select(earliest)
+                .order_by(
+                    earliest.c.day,
+                    earliest.c.start_minute,
+                    earliest.c.car_wash_id,
+                )
+                .limit(limit)
+            )
             result = await session.execute(query)
             return result.fetchall()
+
+    @staticmethod
+    def get_days_subquery(date_from: dt, date_to: dt) -> Subquery:
+        series = select(
+            func.generate_series(
+                datetime.combine(date_from, time.min),
+                datetime.combine(date_to, time.min),
+                timedelta(days=1),
+            ).label('day_start')
+        ).subquery('series')
+
+        return select(
+            series.c.day_start,
+            cast(series.c.day_start, Date).label('day'),
+            # isodow starts from Monday = 1, day_of_week from 0
+            (cast(extract('isodow', series.c.day_start), Integer) - 1).label(
+                'day_of_week'
+            ),
+        ).subquery('days')
+
+    @staticmethod
+    def to_minute_of_day(value: ColumnElement[time]) -> ColumnElement[int]:
+        return cast(
+            extract('hour', value) * 60 + extract('minute', value), Integer
+        )
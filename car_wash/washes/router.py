@@ -1,7 +1,7 @@
 import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends
 
 from car_wash.storage.schemas import AnnValidateImage
 from car_wash.utils.routers import get_admin_router, get_client_router
@@ -38,17 +38,24 @@ async def create_car_wash(
     return {'car_wash_id': car_wash_id}
 
 
+# Has to be declared before /{id}, otherwise it would be matched as an id
+@client_router.get('/free_slots', response_model=schemas.FreeSlotsResponse)
+async def search_free_slots(
+    query: Annotated[schemas.FreeSlotsSearch, Depends()],
+):
+    free_slots = await CarWashService().search_free_slots(query)
+    return {'free_slots': free_slots}
+
+
 @client_router.get('/{id}', response_model=schemas.CarWashRead)
-async def read_car_wash(id: int, bg_tasks: BackgroundTasks):
-    car_wash = await CarWashService().read_car_wash(id, bg_tasks)
+async def read_car_wash(id: int):
+    car_wash = await CarWashService().read_car_wash(id)
     return car_wash
 
 
 @client_router.get('', response_model=schemas.ListResponse)
-async def list_car_washes(
-    query: Annotated[schemas.CarWashList, Depends()], bg_tasks: BackgroundTasks
-):
-    car_washes = await CarWashService().paginate_car_washes(query, bg_tasks)
+async def list_car_washes(query: Annotated[schemas.CarWashList, Depends()]):
+    car_washes = await CarWashService().paginate_car_washes(query)
     return car_washes
 
 
@@ -61,10 +68,9 @@ async def update_car_wash(
     id: int,
     new_values: schemas.CarWashUpdate,
     img: AnnValidateImage,
-    bg_tasks: BackgroundTasks,
 ):
     updated_car_wash = await CarWashService().update_car_wash(
-        id, new_values, img, bg_tasks
+        id, new_values, img
     )
     return updated_car_wash
 
@@ -83,6 +89,19 @@ async def get_available_times(id: int, date: datetime.date):
     return {'available_times': available_times}
 
 
+@client_router.get(
+    '/{id}/available_times/range',
+    response_model=schemas.AvailableTimesRangeResponse,
+)
+async def get_available_times_range(
+    id: int, date_from: datetime.date, date_to: datetime.date
+):
+    available_times = await CarWashService().get_available_times_range(
+        id, date_from, date_to
+    )
+    return {'available_times': available_times}
+
+
 @client_router.post('/{id}/show', response_model=schemas.ShowHideResponse)
 async def show_car_wash(id: int):
     await CarWashService().show_car_wash(id)
@@ -1,8 +1,12 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
-from car_wash.utils.routers import get_admin_router, get_client_router
+from car_wash.utils.routers import (
+    UPSERT,
+    get_admin_router,
+    get_client_router,
+)
 from car_wash.washes.schedules import schemas
 from car_wash.washes.schedules.service import ScheduleService
 
@@ -19,8 +23,14 @@ async def create_schedule(new_schedule: schemas.ScheduleCreate):
 
 
 @admin_router.post('/bulk', response_model=schemas.CreateBulkResponse)
-async def create_schedules(new_schedules: list[schemas.ScheduleCreate]):
-    schedule_ids = await ScheduleService().create_entities(new_schedules)
+async def create_schedules(
+    new_schedules: list[schemas.ScheduleCreate],
+    *,
+    upsert: Annotated[bool, Query(description=UPSERT)] = False,
+):
+    schedule_ids = await ScheduleService().create_entities(
+        new_schedules, upsert=upsert
+    )
     return {'schedule_ids': schedule_ids}
 
 
@@ -1,15 +1,13 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Literal
 
-from pydantic import BaseModel, Field, HttpUrl, field_validator
+from pydantic import BaseModel, Field, HttpUrl
 from pydantic.json_schema import SkipJsonSchema
-from pydantic_core import Url
-from pydantic_core.core_schema import ValidationInfo
 
-from car_wash.config import config
 from car_wash.storage.schemas import CustomBaseModel
 from car_wash.utils.schemas import GenericListRequest, GenericListResponse
 from car_wash.washes.locations.schemas import CarWashLocationRead
+from car_wash.washes.models import MINUTES_IN_DAY
 
 
 class CarWashCreate(CustomBaseModel):
@@ -29,6 +27,8 @@ class CarWashRead(BaseModel):
 
     image_path: str | None = None
     image_link: HttpUrl | None = None
+    thumbnail_link: HttpUrl | None = None
+    preview_link: HttpUrl | None = None
 
     location_id: int
     location: CarWashLocationRead
@@ -37,21 +37,6 @@ class CarWashRead(BaseModel):
     class Config:
         from_attributes = True
 
-    @field_validator('image_link', mode='before')
-    @classmethod
-    def convert_image_link(
-        cls, v: str | HttpUrl, _: ValidationInfo
-    ) -> HttpUrl | None:
-        if not v:
-            return None
-
-        if isinstance(v, Url):
-            return v
-
-        if isinstance(v, str) and config.s3_server_url.host in v:
-            return HttpUrl(v)
-        return HttpUrl(f'{config.s3_server_url}{v.lstrip("/")}')
-
 
 class CarWashList(GenericListRequest):
     order_by: Literal['id', 'name', 'location_id'] = 'id'
@@ -90,5 +75,31 @@ class AvailableTimesResponse(BaseModel):
     available_times: dict[int, list[tuple[datetime, datetime]]]
 
 
+class AvailableTimesRangeResponse(BaseModel):
+    available_times: dict[date, dict[int, list[tuple[datetime, datetime]]]]
+
+
+class FreeSlotsSearch(BaseModel):
+    city: str = Field(examples=['Тараз'])
+    date_from: date
+    date_to: date
+    body_type_id: int = Field(examples=[1])
+    duration: int = Field(
+        default=120, ge=1, le=MINUTES_IN_DAY, description='In minutes'
+    )
+    limit: int = Field(default=10, ge=1, le=100)
+
+
+class FreeSlot(BaseModel):
+    car_wash_id: int
+    box_id: int
+    start_datetime: datetime
+    end_datetime: datetime
+
+
+class FreeSlotsResponse(BaseModel):
+    free_slots: list[FreeSlot]
+
+
 class ShowHideResponse(BaseModel):
     status: str
@@ -1,172 +1,131 @@
-import asyncio
-from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 
-from fastapi import BackgroundTasks, UploadFile
-from pydantic import HttpUrl
+from fastapi import UploadFile
 
 from car_wash.cars.body_types.repository import CarBodyTypeRepository
 from car_wash.storage.schemas import S3Folders
 from car_wash.storage.service import S3Service
-from car_wash.storage.utils import validate_link
 from car_wash.utils.schemas import GenericListResponse
 from car_wash.utils.service import GenericCRUDService
+from car_wash.washes.availability import engine
 from car_wash.washes.bookings.schemas import BookingCreate
 from car_wash.washes.exceptions import (
     AlreadyActiveError,
     AlreadyNotActiveError,
+    DateFromGreaterError,
+    DateRangeTooLongError,
     MissingRequiredBodyTypesError,
     NotEnoughScheduleRecordsError,
 )
-from car_wash.washes.models import Box, CarWash
+from car_wash.washes.models import CarWash
 from car_wash.washes.prices.repository import CarWashPriceRepository
-from car_wash.washes.repository import CarWashRepository, RowProtocol
+from car_wash.washes.repository import CarWashRepository
 from car_wash.washes.schedules.repository import ScheduleRepository
 from car_wash.washes.schemas import (
     CarWashCreate,
     CarWashList,
     CarWashRead,
     CarWashUpdate,
+    FreeSlot,
+    FreeSlotsSearch,
 )
 
 NUMBER_OF_DAYS_IN_WEEK = 7
+MAX_AVAILABLE_TIMES_DAYS = 31
 
 
 class CarWashService(GenericCRUDService[CarWash]):
     repository = CarWashRepository
     crud_repo: CarWashRepository
 
+    min_duration = engine.MIN_DURATION
+
     def __init__(self):
         super().__init__()
         self.s3_service = S3Service()
         self.schedule_repo = ScheduleRepository()
         self.body_type_repo = CarBodyTypeRepository()
         self.price_repo = CarWashPriceRepository()
-        self.available_slots_by_box = None
-        self.schedule_end_by_box = None
-        self.last_end_time_by_box = None
-
-        self.min_duration = timedelta(hours=2)
 
     async def get_available_times(
         self, car_wash_id: int, date: datetime.date
-    ) -> dict[int, list[tuple[datetime, datetime]]]:
-        rows: list[
-            RowProtocol
-        ] = await self.crud_repo.fetch_schedule_and_booking(car_wash_id, date)
-
-        if not rows:
-            return {}
-
-        self.available_slots_by_box: dict[
-            int, list[tuple[datetime, datetime]]
-        ] = defaultdict(list)
-
-        self._initialize_available_slots(date, rows)
-        self._process_bookings()
-
-        return self.available_slots_by_box
+    ) -> dict[int, list[engine.Slot]]:
+        available_times = await self.get_available_times_range(
+            car_wash_id, date, date
+        )
+        return available_times.get(date, {})
 
-    def _initialize_available_slots(
-        self, date: datetime.date, rows: list[RowProtocol]
-    ) -> None:
-        # Track the last end time for each box to calculate the next
-        # available slot
-        self.last_end_time_by_box = {}
-        self.schedule_end_by_box = {}
+    async def get_available_times_range(
+        self,
+        car_wash_id: int,
+        date_from: datetime.date,
+        date_to: datetime.date,
+    ) -> dict[datetime.date, dict[int, list[engine.Slot]]]:
+        self.validate_date_range(date_from, date_to)
+
+        rows = await self.crud_repo.fetch_schedule_and_availability(
+            car_wash_id, date_from, date_to
+        )
+        return engine.group_free_slots(rows, self.min_duration)
+
+    async def search_free_slots(
+        self, query: FreeSlotsSearch
+    ) -> list[FreeSlot]:
+        # Booking datetimes are stored as naive local time
+        now = datetime.now()  # noqa: DTZ005
+        date_from = max(query.date_from, now.date())
+        self.validate_date_range(date_from, query.date_to)
+
+        rows = await self.crud_repo.search_free_slots(
+            query.city,
+            date_from,
+            query.date_to,
+            query.body_type_id,
+            query.duration,
+            now,
+            query.limit,
+        )
 
+        free_slots = []
         for row in rows:
-            box_id = row.box_id
-            schedule_start = datetime.combine(date, row.start_time)
-            schedule_end = datetime.combine(date, row.end_time)
-
-            # Store the schedule_end for this box
-            if box_id not in self.last_end_time_by_box:
-                self.last_end_time_by_box[box_id] = schedule_start
-                self.schedule_end_by_box[box_id] = schedule_end
-
-            # Determine the starting point for available slots
-            previous_booking_end = self.last_end_time_by_box[box_id]
-
-            # If there are no bookings for this box, the entire schedule is
-            # available
-            if row.start_datetime is None:
-                self.available_slots_by_box[box_id].append(
-                    (schedule_start, schedule_end)
-                )
-            else:
-                # Calculate available slot before the current booking
-                if row.start_datetime > previous_booking_end:
-                    new_start = previous_booking_end
-                    new_end = row.start_datetime
-
-                    # Merge if they overlap or are adjacent
-                    if (
-                        self.available_slots_by_box[box_id]
-                        and self.available_slots_by_box[box_id][-1][1]
-                        >= new_start
-                    ):
-                        # Merge with the last slot
-                        last_start, last_end = self.available_slots_by_box[
-                            box_id
-                        ].pop()
-                        self.available_slots_by_box[box_id].append(
-                            (last_start, max(last_end, new_end))
-                        )
-                    elif new_end - new_start >= self.min_duration:
-                        self.available_slots_by_box[box_id].append(
-                            (new_start, new_end)
-                        )
-
-                # Update the last booking end time to the current
-                # booking's end time
-                self.last_end_time_by_box[box_id] = max(
-                    previous_booking_end, row.end_datetime
+            start = datetime.combine(row.day, time.min) + timedelta(
+                minutes=row.start_minute
+            )
+            free_slots.append(
+                FreeSlot(
+                    car_wash_id=row.car_wash_id,
+                    box_id=row.box_id,
+                    start_datetime=start,
+                    end_datetime=start + timedelta(minutes=query.duration),
                 )
+            )
+        return free_slots
 
-    def _process_bookings(self) -> None:
-        for box_id, last_end_time in self.last_end_time_by_box.items():
-            schedule_end = self.schedule_end_by_box[box_id]
-            if last_end_time < schedule_end:
-                new_start = last_end_time
-                new_end = schedule_end
-
-                # Merge if they overlap or are adjacent
-                if (
-                    self.available_slots_by_box[box_id]
-                    and self.available_slots_by_box[box_id][-1][1] >= new_start
-                ):
-                    # Merge with the last slot
-                    last_start, last_end = self.available_slots_by_box[
-                        box_id
-                    ].pop()
-                    self.available_slots_by_box[box_id].append(
-                        (last_start, max(last_end, new_end))
-                    )
-                elif new_end - new_start >= self.min_duration:
-                    self.available_slots_by_box[box_id].append(
-                        (new_start, new_end)
-                    )
-
-    async def is_booking_possible(
-        self, box: Box, new_booking: BookingCreate
+    @staticmethod
+    def validate_date_range(
+        date_from: datetime.date, date_to: datetime.date
+    ) -> None:
+        if date_to < date_from:
+            raise DateFromGreaterError
+        if (date_to - date_from).days >= MAX_AVAILABLE_TIMES_DAYS:
+            raise DateRangeTooLongError(MAX_AVAILABLE_TIMES_DAYS)
+
+    def is_booking_possible(
+        self, new_booking: BookingCreate, schedule: engine.DayScheduleRow
     ) -> bool:
-        available_times = await self.get_available_times(
-            box.car_wash_id, new_booking.start_datetime.date()
-        )
-        if not available_times or box.id not in available_times:
+        if schedule.start_time is None:
             return False
 
-        for datetime_range in available_times[box.id]:
-            start_dt = datetime_range[0]
-            end_dt = datetime_range[1]
-            if (
-                start_dt <= new_booking.start_datetime
-                and end_dt >= new_booking.end_datetime
-            ):
-                return True
-
-        return False
+        free_slots = engine.get_free_slots(
+            new_booking.start_datetime.date(),
+            schedule.start_time,
+            schedule.end_time,
+            schedule.occupied,
+            self.min_duration,
+        )
+        return engine.fits_in_free_slots(
+            free_slots, new_booking.start_datetime, new_booking.end_datetime
+        )
 
     async def create_car_wash(
         self,
@@ -177,80 +136,73 @@ class CarWashService(GenericCRUDService[CarWash]):
             unique_filename = await self.s3_service.upload_file(
                 S3Folders.CAR_WASHES, image
             )
+            self.s3_service.schedule_variants(unique_filename)
             new_car_wash.image_path = unique_filename
 
         car_wash_id = await self.crud_repo.add_one(new_car_wash.model_dump())
         return car_wash_id
 
-    async def read_car_wash(
-        self,
-        id_: int,
-        bg_tasks: BackgroundTasks,
-    ) -> CarWashRead:
+    async def read_car_wash(self, id_: int) -> CarWashRead:
         user = await self.crud_repo.find_one(id_)
-        return await self.add_img_link_to_car_wash(user, bg_tasks)
+        return await self.add_img_link_to_car_wash(user)
 
     async def paginate_car_washes(
-        self, query: CarWashList, bg_tasks: BackgroundTasks
+        self, query: CarWashList
     ) -> GenericListResponse:
         list_response = await self.paginate_entities(query)
-
-        tasks = [
-            self.add_img_link_to_car_wash(car_wash, bg_tasks)
-            for car_wash in list_response.data
-        ]
-
-        res = await asyncio.gather(*tasks)
-        list_response.data = res
-
+        list_response.data = await self.add_img_links_to_car_washes(
+            list_response.data
+        )
         return list_response
 
     async def add_img_link_to_car_wash(
-        self,
-        car_wash: CarWash | CarWashRead,
-        bg_tasks: BackgroundTasks,
+        self, car_wash: CarWash | CarWashRead
     ) -> CarWashRead:
-        if isinstance(car_wash, CarWash):
-            car_wash = CarWashRead.model_validate(car_wash)
-
-        img_link = car_wash.image_link
-
-        if car_wash.image_path and (
-            not img_link or not validate_link(img_link, car_wash.image_path)
-        ):
-            image_link = await self.s3_service.generate_link(
-                car_wash.image_path
-            )
-
-            image_link = HttpUrl(image_link)
-            car_wash.image_link = image_link
-            new_img_link = f'{image_link.path}?{image_link.query}'
+        car_washes = await self.add_img_links_to_car_washes([car_wash])
+        return car_washes[0]
+
+    async def add_img_links_to_car_washes(
+        self, car_washes: list[CarWash | CarWashRead]
+    ) -> list[CarWashRead]:
+        car_washes = [
+            CarWashRead.model_validate(car_wash)
+            if isinstance(car_wash, CarWash)
+            else car_wash
+            for car_wash in car_washes
+        ]
+        with_image = [
+            car_wash for car_wash in car_washes if car_wash.image_path
+        ]
+        # The whole page is signed in one pass, variants included
+        links = await self.s3_service.generate_image_links(
+            car_wash.image_path for car_wash in with_image
+        )
 
-            bg_tasks.add_task(
-                self.crud_repo.change_one,
-                car_wash.id,
-                {'image_link': new_img_link},
-            )
+        for car_wash in with_image:
+            image_links = links[car_wash.image_path]
+            car_wash.image_link = image_links.image_link
+            car_wash.thumbnail_link = image_links.thumbnail_link
+            car_wash.preview_link = image_links.preview_link
 
-        return car_wash
+        return car_washes
 
     async def update_car_wash(
         self,
         id: int,
         new_values: CarWashUpdate,
         img: UploadFile | None,
-        bg_tasks: BackgroundTasks,
     ) -> CarWashRead:
         if img:
             car_wash = await self.read_entity(id)
             unique_filename = await self.s3_service.upload_file(
                 S3Folders.CAR_WASHES, img, car_wash.image_path
             )
+            self.s3_service.schedule_variants(unique_filename)
 
             new_values.image_path = unique_filename
 
         updated_car_wash = await self.update_entity(id, new_values)
-        return await self.add_img_link_to_car_wash(updated_car_wash, bg_tasks)
+        return await self.add_img_link_to_car_wash(updated_car_wash)
 
     async def delete_car_wash(self, id: int) -> CarWash:
         car_wash = await self.crud_repo.delete_one(id)
@@ -0,0 +1,42 @@
+"""booking non-overlap constraint
+
+Revision ID: 5c1d7e3a9f42
+Revises: 2b86499040c2
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d7e3a9f42'
+down_revision: Union[str, None] = '2b86499040c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Equality on box_id inside a gist index
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+
+    # Fails if overlapping bookings already exist, they have to be
+    # resolved by hand before the upgrade
+    op.execute(
+        """
+        ALTER TABLE car_wash__booking
+        ADD CONSTRAINT excl_car_wash_booking___box_id__time_range
+        EXCLUDE USING gist (
+            box_id WITH =,
+            tsrange(start_datetime, end_datetime) WITH &&
+        )
+        WHERE (state <> 'EXCEPTION')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        'excl_car_wash_booking___box_id__time_range', 'car_wash__booking'
+    )
@@ -0,0 +1,73 @@
+"""hot path indexes
+
+Revision ID: 7e4b2f9c1a63
+Revises: 5c1d7e3a9f42
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e4b2f9c1a63'
+down_revision: Union[str, None] = '5c1d7e3a9f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_car_wash___location_id', 'car_wash', ['location_id'], 'active'),
+    ('ix_car_wash_box___car_wash_id', 'car_wash__box', ['car_wash_id'], None),
+    (
+        'ix_car_wash_booking___box_id__start_datetime__end_datetime',
+        'car_wash__booking',
+        ['box_id', 'start_datetime', 'end_datetime'],
+        "state <> 'EXCEPTION'",
+    ),
+    (
+        'ix_car_wash_booking___box_id__id',
+        'car_wash__booking',
+        ['box_id', 'id'],
+        None,
+    ),
+    (
+        'ix_car_wash_booking___user_car_id',
+        'car_wash__booking',
+        ['user_car_id'],
+        None,
+    ),
+    (
+        'ix_car_wash_price___body_type_id',
+        'car_wash__price',
+        ['body_type_id'],
+        None,
+    ),
+    ('ix_user_car___user_id', 'user_car', ['user_id'], None),
+]
+
+
+def upgrade() -> None:
+    # Built without locking the tables against writes
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,68 @@
+"""trigram search indexes
+
+Revision ID: a3f8d2c6b914
+Revises: 7e4b2f9c1a63
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f8d2c6b914'
+down_revision: Union[str, None] = '7e4b2f9c1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCHED_COLUMNS = [
+    ('ix_car_brand_', 'car__brand', 'name'),
+    ('ix_car_model_', 'car__model', 'name'),
+    ('ix_car_generation_', 'car__generation', 'name'),
+    ('ix_user_car_', 'user_car', 'name'),
+]
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Built without locking the tables against writes
+    with op.get_context().autocommit_block():
+        for prefix, table, column in SEARCHED_COLUMNS:
+            # Substring matches of 3 and more characters
+            op.create_index(
+                f'{prefix}__{column}_trgm',
+                table,
+                [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+            # Prefix matches of shorter values
+            op.create_index(
+                f'{prefix}__lower_{column}',
+                table,
+                [sa.text(f'lower({column}) text_pattern_ops')],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for prefix, table, column in reversed(SEARCHED_COLUMNS):
+            op.drop_index(
+                f'{prefix}__lower_{column}',
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+            op.drop_index(
+                f'{prefix}__{column}_trgm',
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
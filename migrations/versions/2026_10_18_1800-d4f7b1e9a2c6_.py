@@ -0,0 +1,36 @@
+"""unnamed car generations are unique per model
+
+Revision ID: d4f7b1e9a2c6
+Revises: c8e2a5d7f193
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f7b1e9a2c6'
+down_revision: Union[str, None] = 'c8e2a5d7f193'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINT = 'uix_car_generation__name_model_id'
+
+
+def upgrade() -> None:
+    op.drop_constraint(CONSTRAINT, 'car__generation', type_='unique')
+    op.create_unique_constraint(
+        CONSTRAINT,
+        'car__generation',
+        ['name', 'model_id'],
+        postgresql_nulls_not_distinct=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(CONSTRAINT, 'car__generation', type_='unique')
+    op.create_unique_constraint(
+        CONSTRAINT, 'car__generation', ['name', 'model_id']
+    )
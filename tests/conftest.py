@@ -0,0 +1,192 @@
+import asyncio
+import contextvars
+import uuid
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from datetime import time
+from typing import Any, NamedTuple
+
+import pytest
+from sqlalchemy import delete, event, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from car_wash.cars.models import (
+    CarBodyType,
+    CarBrand,
+    CarConfiguration,
+    CarGeneration,
+    CarModel,
+    UserCar,
+)
+from car_wash.database import Base, async_engine, async_session_maker
+from car_wash.users.models import Role, User
+from car_wash.washes.locations.models import CarWashLocation
+from car_wash.washes.models import (
+    Booking,
+    Box,
+    BoxAvailability,
+    CarWash,
+    CarWashPrice,
+    Schedule,
+)
+
+Run = Callable[[Awaitable[Any]], Any]
+
+BOXES = 3
+DAYS_IN_WEEK = 7
+OPENS, CLOSES = time(8), time(22)
+PRICE = 1000
+
+
+class SeededCarWash(NamedTuple):
+    car_wash_id: int
+    box_ids: list[int]
+    user_id: int
+    user_car_id: int
+    body_type_id: int
+    city: str
+
+
+# One event loop for all tests, pooled connections are bound to it.
+# Every run gets a fresh context, so context variables do not leak
+@pytest.fixture(scope='session')
+def run() -> Iterator[Run]:
+    with asyncio.Runner() as runner:
+        yield lambda coro: runner.run(coro, context=contextvars.Context())
+
+
+# Tests using it need a migrated database at DATABASE_URL
+@pytest.fixture(scope='session')
+def database(run: Run) -> None:
+    async def ping() -> None:
+        async with async_engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+
+    try:
+        run(ping())
+    except (OSError, SQLAlchemyError) as e:
+        pytest.skip(f'Database is not available: {e}')
+
+
+# SQL and parameters of every statement sent while the block runs
+@contextmanager
+def record_statements() -> Iterator[list[tuple[str, Any]]]:
+    statements = []
+
+    def record(*args: Any) -> None:
+        statements.append((args[2], args[3]))
+
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', record)
+
+
+async def create_car_wash(created: list[Base]) -> SeededCarWash:
+    suffix = uuid.uuid4().hex[:8]
+    async with async_session_maker() as session, session.begin():
+
+        async def add(entity: Base) -> Base:
+            session.add(entity)
+            await session.flush()
+            created.append(entity)
+            return entity
+
+        role = await add(Role(name=f'test_{suffix}'))
+        user = await add(
+            User(
+                username=f'test_{suffix}',
+                hashed_password='',
+                first_name='Test',
+                last_name='User',
+                confirmed=True,
+                active=True,
+                role_id=role.id,
+            )
+        )
+        brand = await add(CarBrand(name=f'Brand {suffix}'))
+        model = await add(CarModel(name='Model', brand_id=brand.id))
+        generation = await add(
+            CarGeneration(
+                name='I', model_id=model.id, start_year='2020', end_year='2024'
+            )
+        )
+        body_type = await add(CarBodyType(name=f'Body {suffix}'))
+        configuration = await add(
+            CarConfiguration(
+                generation_id=generation.id, body_type_id=body_type.id
+            )
+        )
+        user_car = await add(
+            UserCar(
+                name='Car',
+                user_id=user.id,
+                configuration_id=configuration.id,
+                is_verified=True,
+                license_plate='A000AA',
+            )
+        )
+        location = await add(
+            CarWashLocation(city=f'City {suffix}', address='Street')
+        )
+        car_wash = await add(
+            CarWash(
+                name=f'Wash {suffix}', active=True, location_id=location.id
+            )
+        )
+        for day_of_week in range(DAYS_IN_WEEK):
+            await add(
+                Schedule(
+                    car_wash_id=car_wash.id,
+                    day_of_week=day_of_week,
+                    start_time=OPENS,
+                    end_time=CLOSES,
+                    is_available=True,
+                )
+            )
+        await add(
+            CarWashPrice(
+                car_wash_id=car_wash.id,
+                body_type_id=body_type.id,
+                price=PRICE,
+            )
+        )
+        boxes = [
+            await add(
+                Box(name=f'Box {i}', car_wash_id=car_wash.id, user_id=user.id)
+            )
+            for i in range(BOXES)
+        ]
+        return SeededCarWash(
+            car_wash.id,
+            [box.id for box in boxes],
+            user.id,
+            user_car.id,
+            body_type.id,
+            location.city,
+        )
+
+
+async def remove_created(created: list[Base]) -> None:
+    box_ids = [entity.id for entity in created if isinstance(entity, Box)]
+    async with async_session_maker() as session, session.begin():
+        await session.execute(
+            delete(Booking).where(Booking.box_id.in_(box_ids))
+        )
+        await session.execute(
+            delete(BoxAvailability).where(BoxAvailability.box_id.in_(box_ids))
+        )
+        for entity in reversed(created):
+            model = type(entity)
+            await session.execute(delete(model).where(model.id == entity.id))
+
+
+# A car wash open every day with a few boxes and a priced user car
+@pytest.fixture
+def seeded(run: Run, database: None) -> Iterator[SeededCarWash]:  # noqa: ARG001
+    created = []
+    try:
+        yield run(create_car_wash(created))
+    finally:
+        run(remove_created(created))
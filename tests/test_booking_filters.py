@@ -0,0 +1,59 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from car_wash.auth.dependencies import get_user_client
+from car_wash.database import get_unit_of_work
+from car_wash.washes.bookings.router import router
+from car_wash.washes.bookings.schemas import BookingList, StateEnum
+from car_wash.washes.bookings.service import BookingService
+
+
+async def no_dependency() -> None:
+    pass
+
+
+@pytest.fixture
+def queries(monkeypatch: pytest.MonkeyPatch) -> list[BookingList]:
+    queries = []
+
+    async def paginate_entities(_: BookingService, query: BookingList) -> dict:
+        queries.append(query)
+        return {'data': []}
+
+    monkeypatch.setattr(BookingService, 'paginate_entities', paginate_entities)
+    return queries
+
+
+@pytest.fixture
+def client() -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_unit_of_work] = no_dependency
+    app.dependency_overrides[get_user_client] = no_dependency
+    return TestClient(app)
+
+
+def test_states_are_read_from_query(
+    client: TestClient, queries: list[BookingList]
+):
+    response = client.get(
+        '/bookings', params={'state': ['CREATED', 'COMPLETED'], 'box_id': 1}
+    )
+
+    assert response.status_code == 200
+    assert queries[0].get_filters() == {
+        'box_id': 1,
+        'state__in': [StateEnum.CREATED, StateEnum.COMPLETED],
+    }
+
+
+def test_states_are_optional(client: TestClient, queries: list[BookingList]):
+    response = client.get('/bookings')
+
+    assert response.status_code == 200
+    assert queries[0].get_filters() == {}
+
+
+def test_list_defaults_to_no_filters():
+    assert BookingList().get_filters() == {}
@@ -0,0 +1,130 @@
+import asyncio
+import random
+from datetime import datetime, time, timedelta
+from itertools import combinations
+
+from sqlalchemy import select
+
+from car_wash.database import UnitOfWork, async_session_maker
+from car_wash.washes.bookings.repository import BookingRepository
+from car_wash.washes.bookings.schemas import BookingCreate
+from car_wash.washes.bookings.service import BookingService
+from car_wash.washes.exceptions import BookingIsNotAvailableError
+from car_wash.washes.models import Booking
+from tests.conftest import Run, SeededCarWash
+
+CONCURRENT_REQUESTS = 300
+DURATION = timedelta(hours=2)
+# Starts every 10 minutes between 10:00 and 16:00, so most of the
+# requested intervals overlap some others only partly
+FIRST_START = time(10)
+START_STEP_MINUTES = 10
+START_STEPS = 36
+# Long enough for the second insert to wait on the first transaction
+LOCK_WAIT = 0.3
+
+
+async def book(new_booking: BookingCreate) -> int:
+    # Every booking in its own unit of work, as separate requests do
+    async with UnitOfWork():
+        return await BookingService().create_booking(new_booking)
+
+
+async def read_bookings(box_ids: list[int]) -> list[Booking]:
+    async with async_session_maker() as session:
+        bookings = await session.scalars(
+            select(Booking).where(Booking.box_id.in_(box_ids))
+        )
+        return list(bookings)
+
+
+def booking_row(seeded: SeededCarWash, start: datetime) -> dict:
+    return {
+        'user_car_id': seeded.user_car_id,
+        'box_id': seeded.box_ids[0],
+        'base_price': 1,
+        'total_price': 1,
+        'additions': [],
+        'start_datetime': start,
+        'end_datetime': start + DURATION,
+        'state': 'CREATED',
+    }
+
+
+def test_deadlock_in_exclusion_check_is_not_available(
+    run: Run, seeded: SeededCarWash
+):
+    next_week = datetime.now() + timedelta(days=7)  # noqa: DTZ005
+    first_start = datetime.combine(next_week.date(), FIRST_START)
+    first_inserted = asyncio.Event()
+
+    # The first transaction books 10:00-12:00, the second one waits on it
+    # with 11:00-13:00, then the first one waits on the second with
+    # 12:30-14:30 and postgres has to abort one of them
+    async def first() -> None:
+        async with UnitOfWork():
+            repo = BookingRepository()
+            await repo.add_one(booking_row(seeded, first_start))
+            first_inserted.set()
+            await asyncio.sleep(LOCK_WAIT)
+            await repo.add_one(
+                booking_row(seeded, first_start + timedelta(minutes=150))
+            )
+
+    async def second() -> None:
+        await first_inserted.wait()
+        async with UnitOfWork():
+            await BookingRepository().add_one(
+                booking_row(seeded, first_start + timedelta(hours=1))
+            )
+
+    async def book_both() -> list[None | BaseException]:
+        return await asyncio.gather(first(), second(), return_exceptions=True)
+
+    results = run(book_both())
+
+    errors = [result for result in results if result is not None]
+    assert len(errors) == 1
+    assert isinstance(errors[0], BookingIsNotAvailableError)
+
+
+def test_overlapping_bookings_are_rejected(run: Run, seeded: SeededCarWash):
+    next_week = datetime.now() + timedelta(days=7)  # noqa: DTZ005
+    first_start = datetime.combine(next_week.date(), FIRST_START)
+    randomizer = random.Random(CONCURRENT_REQUESTS)  # noqa: S311
+    requests = []
+    for _ in range(CONCURRENT_REQUESTS):
+        step = randomizer.randrange(START_STEPS)
+        start = first_start + timedelta(minutes=START_STEP_MINUTES * step)
+        requests.append(
+            BookingCreate(
+                box_id=randomizer.choice(seeded.box_ids),
+                user_car_id=seeded.user_car_id,
+                start_datetime=start,
+                end_datetime=start + DURATION,
+            )
+        )
+
+    async def book_all() -> list[int | BaseException]:
+        return await asyncio.gather(
+            *(book(new_booking) for new_booking in requests),
+            return_exceptions=True,
+        )
+
+    results = run(book_all())
+
+    booked = [result for result in results if isinstance(result, int)]
+    unexpected = [
+        result
+        for result in results
+        if not isinstance(result, int | BookingIsNotAvailableError)
+    ]
+    assert not unexpected
+    bookings = run(read_bookings(seeded.box_ids))
+    assert sorted(booking.id for booking in bookings) == sorted(booked)
+    assert {booking.box_id for booking in bookings} == set(seeded.box_ids)
+    for first, second in combinations(bookings, 2):
+        assert first.box_id != second.box_id or (
+            first.end_datetime <= second.start_datetime
+            or second.end_datetime <= first.start_datetime
+        )
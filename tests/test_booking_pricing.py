@@ -0,0 +1,85 @@
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from car_wash.database import UnitOfWork, async_session_maker
+from car_wash.washes.bookings.schemas import BookingCreate
+from car_wash.washes.bookings.service import BookingService
+from car_wash.washes.exceptions import BoxOrUserCarNotFoundError
+from car_wash.washes.models import Booking, CarWashAddition
+from tests.conftest import PRICE, Run, SeededCarWash, record_statements
+
+ADDITION_PRICES = [Decimal(150), Decimal('99.50')]
+
+
+def next_week_booking(
+    seeded: SeededCarWash, **kwargs: object
+) -> BookingCreate:
+    day = (datetime.now() + timedelta(days=7)).date()  # noqa: DTZ005
+    return BookingCreate(
+        box_id=seeded.box_ids[0],
+        user_car_id=seeded.user_car_id,
+        start_datetime=datetime.combine(day, time(10)),
+        end_datetime=datetime.combine(day, time(12)),
+        **kwargs,
+    )
+
+
+async def create_booking(new_booking: BookingCreate) -> int:
+    async with UnitOfWork():
+        return await BookingService().create_booking(new_booking)
+
+
+async def add_additions(car_wash_id: int) -> list[int]:
+    async with async_session_maker() as session, session.begin():
+        additions = [
+            CarWashAddition(
+                car_wash_id=car_wash_id, name=f'Addition {price}', price=price
+            )
+            for price in ADDITION_PRICES
+        ]
+        session.add_all(additions)
+        await session.flush()
+        return [addition.id for addition in additions]
+
+
+async def read_booking(booking_id: int) -> Booking:
+    async with async_session_maker() as session:
+        return await session.scalar(
+            select(Booking).where(Booking.id == booking_id)
+        )
+
+
+def test_booking_is_priced_with_one_lookup(run: Run, seeded: SeededCarWash):
+    addition_ids = run(add_additions(seeded.car_wash_id))
+
+    with record_statements() as statements:
+        booking_id = run(
+            create_booking(
+                next_week_booking(seeded, addition_ids=addition_ids)
+            )
+        )
+
+    selects = [
+        statement
+        for statement, _ in statements
+        if statement.lstrip().upper().startswith('SELECT')
+    ]
+    assert len(selects) == 1
+    booking = run(read_booking(booking_id))
+    assert booking.base_price == PRICE
+    assert booking.total_price == PRICE + sum(ADDITION_PRICES)
+    assert sorted(
+        json.loads(addition)['id'] for addition in booking.additions
+    ) == sorted(addition_ids)
+
+
+def test_missing_user_car_is_reported(run: Run, seeded: SeededCarWash):
+    new_booking = next_week_booking(seeded)
+    new_booking.user_car_id = 0
+
+    with pytest.raises(BoxOrUserCarNotFoundError):
+        run(create_booking(new_booking))
@@ -0,0 +1,60 @@
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import Text, cast, select
+
+from car_wash.database import UnitOfWork, async_session_maker
+from car_wash.washes.bookings.schemas import BookingCreate
+from car_wash.washes.bookings.service import BookingService
+from car_wash.washes.models import MINUTES_IN_DAY, BoxAvailability
+from tests.conftest import Run, SeededCarWash
+
+START, END = time(10), time(12)
+
+
+def minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+async def read_occupied(box_id: int, day: datetime) -> str | None:
+    async with async_session_maker() as session:
+        return await session.scalar(
+            select(cast(BoxAvailability.occupied, Text)).where(
+                BoxAvailability.box_id == box_id,
+                BoxAvailability.day == day.date(),
+            )
+        )
+
+
+async def create_booking(new_booking: BookingCreate) -> int:
+    async with UnitOfWork():
+        return await BookingService().create_booking(new_booking)
+
+
+async def delete_booking(booking_id: int) -> None:
+    async with UnitOfWork():
+        await BookingService().delete_entity(booking_id)
+
+
+def test_booking_marks_and_frees_its_minutes(run: Run, seeded: SeededCarWash):
+    box_id = seeded.box_ids[0]
+    day = datetime.now() + timedelta(days=7)  # noqa: DTZ005
+    booking_id = run(
+        create_booking(
+            BookingCreate(
+                box_id=box_id,
+                user_car_id=seeded.user_car_id,
+                start_datetime=datetime.combine(day.date(), START),
+                end_datetime=datetime.combine(day.date(), END),
+            )
+        )
+    )
+
+    start, end = minute_of_day(START), minute_of_day(END)
+    occupied = run(read_occupied(box_id, day))
+    assert occupied == '0' * start + '1' * (end - start) + '0' * (
+        MINUTES_IN_DAY - end
+    )
+
+    run(delete_booking(booking_id))
+
+    assert run(read_occupied(box_id, day)) == '0' * MINUTES_IN_DAY
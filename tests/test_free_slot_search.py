@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+from car_wash.database import UnitOfWork
+from car_wash.washes.bookings.schemas import BookingCreate
+from car_wash.washes.bookings.service import BookingService
+from car_wash.washes.schemas import FreeSlot, FreeSlotsSearch
+from car_wash.washes.service import CarWashService
+from tests.conftest import OPENS, Run, SeededCarWash
+
+DURATION = timedelta(hours=2)
+
+
+async def book_every_box(
+    seeded: SeededCarWash, start: datetime, end: datetime
+) -> None:
+    async with UnitOfWork():
+        for box_id in seeded.box_ids:
+            await BookingService().create_booking(
+                BookingCreate(
+                    box_id=box_id,
+                    user_car_id=seeded.user_car_id,
+                    start_datetime=start,
+                    end_datetime=end,
+                )
+            )
+
+
+async def search(seeded: SeededCarWash, start: datetime) -> list[FreeSlot]:
+    return await CarWashService().search_free_slots(
+        FreeSlotsSearch(
+            city=seeded.city,
+            date_from=start.date(),
+            date_to=start.date(),
+            body_type_id=seeded.body_type_id,
+            duration=DURATION // timedelta(minutes=1),
+        )
+    )
+
+
+def next_week_opening() -> datetime:
+    day = datetime.now() + timedelta(days=7)  # noqa: DTZ005
+    return datetime.combine(day.date(), OPENS)
+
+
+def test_earliest_slot_is_at_opening(run: Run, seeded: SeededCarWash):
+    opening = next_week_opening()
+
+    assert run(search(seeded, opening)) == [
+        FreeSlot(
+            car_wash_id=seeded.car_wash_id,
+            box_id=seeded.box_ids[0],
+            start_datetime=opening,
+            end_datetime=opening + DURATION,
+        )
+    ]
+
+
+def test_booked_minutes_are_skipped(run: Run, seeded: SeededCarWash):
+    opening = next_week_opening()
+    booked_until = opening + DURATION
+    run(book_every_box(seeded, opening, booked_until))
+
+    assert run(search(seeded, opening)) == [
+        FreeSlot(
+            car_wash_id=seeded.car_wash_id,
+            box_id=seeded.box_ids[0],
+            start_datetime=booked_until,
+            end_datetime=booked_until + DURATION,
+        )
+    ]
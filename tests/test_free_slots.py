@@ -0,0 +1,54 @@
+from datetime import date, datetime, time, timedelta
+
+from car_wash.washes.availability import engine
+
+DAY = date(2026, 10, 19)
+MINUTES_IN_DAY = 24 * 60
+
+
+def bitmap(*booked: tuple[time, time]) -> str:
+    bits = ['0'] * MINUTES_IN_DAY
+    for start, end in booked:
+        for minute in range(
+            start.hour * 60 + start.minute, end.hour * 60 + end.minute
+        ):
+            bits[minute] = '1'
+    return ''.join(bits)
+
+
+def at(value: time, day: date = DAY) -> datetime:
+    return datetime.combine(day, value)
+
+
+def test_batch_matches_every_row():
+    next_day = DAY + timedelta(days=1)
+    rows = [
+        engine.FreeSlotsRow(DAY, 1, time(8), time(22), None),
+        engine.FreeSlotsRow(
+            DAY, 2, time(8), time(22), bitmap((time(10), time(12)))
+        ),
+        engine.FreeSlotsRow(
+            DAY,
+            3,
+            time(8),
+            time(22),
+            bitmap((time(9), time(11)), (time(12), time(20))),
+        ),
+        engine.FreeSlotsRow(
+            next_day, 1, time(9), time(18), bitmap((time(7), time(8)))
+        ),
+    ]
+
+    assert engine.compute_free_slots(rows) == [
+        [(at(time(8)), at(time(22)))],
+        [(at(time(8)), at(time(10))), (at(time(12)), at(time(22)))],
+        # One hour gaps are too short for a booking
+        [(at(time(20)), at(time(22)))],
+        [(at(time(9), next_day), at(time(18), next_day))],
+    ]
+    assert [
+        engine.get_free_slots(
+            row.day, row.start_time, row.end_time, row.occupied
+        )
+        for row in rows
+    ] == engine.compute_free_slots(rows)
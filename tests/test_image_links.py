@@ -0,0 +1,128 @@
+import asyncio
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import pytest
+from botocore.exceptions import ClientError
+
+from car_wash.storage.service import S3Service
+from car_wash.storage.variants import ImageVariant, get_variant_key
+
+
+class FakeS3Client:
+    def __init__(self, keys: set[str]):
+        self.keys = keys
+        self.heads = 0
+
+    async def head_object(self, **params: str) -> dict:
+        self.heads += 1
+        if params['Key'] not in self.keys:
+            error = {'Error': {'Code': '404'}}
+            raise ClientError(error, 'HeadObject')
+        return {}
+
+    async def generate_presigned_url(self, _: str, **params: dict) -> str:
+        key = params['Params']['Key']
+        return f'http://minio:9000/bucket/{key}?Expires=1'
+
+
+# Signs only when released, so concurrent requests pile up meanwhile
+class SlowS3Client(FakeS3Client):
+    def __init__(self):
+        super().__init__(set())
+        self.signed = 0
+        self.signing = asyncio.Event()
+        self.released = asyncio.Event()
+
+    async def generate_presigned_url(self, _: str, **params: dict) -> str:
+        self.signed += 1
+        self.signing.set()
+        await self.released.wait()
+        return await super().generate_presigned_url(_, **params)
+
+
+@pytest.fixture
+def image_path() -> str:
+    return f'avatars/{uuid.uuid4()}'
+
+
+@contextmanager
+def use_client(client: FakeS3Client) -> Iterator[S3Service]:
+    async def get_client() -> FakeS3Client:
+        return client
+
+    s3_service = S3Service()
+    s3_service.get_client = get_client
+    try:
+        yield s3_service
+    finally:
+        del s3_service.get_client
+
+
+def generate_image_links(client: FakeS3Client, image_path: str) -> dict:
+    with use_client(client) as s3_service:
+        return asyncio.run(s3_service.generate_image_links([image_path]))
+
+
+def test_missing_variants_fall_back_to_original(image_path: str):
+    thumbnail = get_variant_key(image_path, ImageVariant.THUMBNAIL)
+    client = FakeS3Client({image_path, thumbnail})
+
+    links = generate_image_links(client, image_path)[image_path]
+
+    assert links.thumbnail_link.path.endswith(thumbnail)
+    assert links.preview_link == links.image_link
+
+
+def test_variant_lookups_are_cached(image_path: str):
+    client = FakeS3Client({image_path})
+
+    generate_image_links(client, image_path)
+    generate_image_links(client, image_path)
+
+    assert client.heads == len(ImageVariant)
+
+
+def test_concurrent_requests_sign_once(image_path: str):
+    async def generate_links() -> list[dict[str, str]]:
+        client = SlowS3Client()
+        with use_client(client) as s3_service:
+            requests = [
+                asyncio.create_task(s3_service.generate_links([image_path]))
+                for _ in range(10)
+            ]
+            await client.signing.wait()
+            client.released.set()
+            links = await asyncio.gather(*requests)
+        assert client.signed == 1
+        return links
+
+    links = asyncio.run(generate_links())
+
+    assert len({request_links[image_path] for request_links in links}) == 1
+
+
+def test_waiters_sign_when_owner_is_cancelled(image_path: str):
+    async def generate_links() -> dict[str, str]:
+        client = SlowS3Client()
+        with use_client(client) as s3_service:
+            owner = asyncio.create_task(
+                s3_service.generate_links([image_path])
+            )
+            await client.signing.wait()
+            waiter = asyncio.create_task(
+                s3_service.generate_links([image_path])
+            )
+            await asyncio.sleep(0)
+            owner.cancel()
+            await asyncio.sleep(0)
+            client.released.set()
+            links = await waiter
+        assert owner.cancelled()
+        assert client.signed == 2
+        return links
+
+    links = asyncio.run(generate_links())
+
+    assert links[image_path].endswith(f'{image_path}?Expires=1')
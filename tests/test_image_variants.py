@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import io
+import logging
+import uuid
+
+import pytest
+from botocore.exceptions import ClientError
+from PIL import Image
+
+from car_wash.storage import service
+from car_wash.storage.service import VARIANT_ATTEMPTS, S3Service
+from car_wash.storage.variants import ImageVariant
+
+
+class FakeBody:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aenter__(self) -> 'FakeBody':
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        pass
+
+    async def read(self) -> bytes:
+        return self.data
+
+
+class FakeS3Client:
+    def __init__(self, objects: dict[str, bytes]):
+        self.objects = objects
+        self.metadata: dict[str, dict[str, str]] = {}
+        self.put_objects = []
+
+    @staticmethod
+    def get_etag(data: bytes) -> str:
+        digest = hashlib.md5(data, usedforsecurity=False).hexdigest()
+        return f'"{digest}"'
+
+    async def head_object(self, **params: str) -> dict:
+        key = params['Key']
+        if key not in self.objects:
+            error = {'Error': {'Code': '404'}}
+            raise ClientError(error, 'HeadObject')
+        return {
+            'ETag': self.get_etag(self.objects[key]),
+            'Metadata': self.metadata.get(key, {}),
+        }
+
+    async def get_object(self, **params: str) -> dict:
+        return {'Body': FakeBody(self.objects[params['Key']])}
+
+    async def put_object(self, **params: object) -> dict:
+        self.put_objects.append(params['Key'])
+        self.objects[params['Key']] = params['Body']
+        self.metadata[params['Key']] = params['Metadata']
+        return {'ETag': self.get_etag(params['Body'])}
+
+
+class BrokenS3Client:
+    def __init__(self, error: Exception):
+        self.error = error
+        self.heads = 0
+
+    async def head_object(self, **_: str) -> dict:
+        self.heads += 1
+        raise self.error
+
+
+@pytest.fixture
+def image_path() -> str:
+    return f'avatars/{uuid.uuid4()}'
+
+
+@pytest.fixture
+def image() -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def no_index(monkeypatch: pytest.MonkeyPatch):
+    async def index_files(*_: object) -> None:
+        pass
+
+    monkeypatch.setattr(S3Service(), 'index_files', index_files)
+
+
+@pytest.fixture
+def delays(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    delays = []
+    sleep = asyncio.sleep
+
+    async def record_sleep(delay: float) -> None:
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(service.asyncio, 'sleep', record_sleep)
+    return delays
+
+
+def create_variants(client: object, image_path: str) -> None:
+    async def get_client() -> object:
+        return client
+
+    s3_service = S3Service()
+    s3_service.get_client = get_client
+    try:
+        asyncio.run(s3_service.create_variants_with_retries(image_path))
+    finally:
+        del s3_service.get_client
+
+
+def test_variants_are_made_once_per_etag(image_path: str, image: bytes):
+    client = FakeS3Client({image_path: image})
+
+    create_variants(client, image_path)
+    create_variants(client, image_path)
+
+    assert len(client.put_objects) == len(ImageVariant)
+
+
+def test_no_delay_after_last_attempt(image_path: str, delays: list[float]):
+    client = BrokenS3Client(
+        ClientError({'Error': {'Code': '500'}}, 'HeadObject')
+    )
+
+    create_variants(client, image_path)
+
+    assert client.heads == VARIANT_ATTEMPTS
+    assert len(delays) == VARIANT_ATTEMPTS - 1
+
+
+def test_unexpected_errors_are_logged(
+    image_path: str, caplog: pytest.LogCaptureFixture
+):
+    client = BrokenS3Client(RuntimeError('Index is gone'))
+
+    with caplog.at_level(logging.ERROR, logger='uvicorn.error'):
+        create_variants(client, image_path)
+
+    assert client.heads == 1
+    assert f'Variants of {image_path} failed' in caplog.text
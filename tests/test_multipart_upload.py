@@ -0,0 +1,111 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from car_wash.storage import service
+from car_wash.storage.schemas import S3Folders
+from car_wash.storage.service import UPLOAD_CONCURRENCY, S3Service
+
+CHUNK_SIZE = 4
+CHUNKS = 20
+
+
+class FakeS3Client:
+    def __init__(self, error: BaseException | None = None):
+        self.error = error
+        self.aborted = []
+        self.put_objects = []
+        self.parts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def put_object(self, **params: str) -> dict:
+        self.put_objects.append(params['Key'])
+        return {'ETag': '"etag"'}
+
+    async def create_multipart_upload(self, **params: str) -> dict:
+        return {'UploadId': f'upload-{params["Key"]}'}
+
+    async def upload_part(self, **params: str) -> dict:
+        self.parts += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Let the reading loop try to start more parts meanwhile
+            await asyncio.sleep(0.001)
+            if self.error is not None:
+                raise self.error
+            return {'ETag': f'"part-{params["PartNumber"]}"'}
+        finally:
+            self.in_flight -= 1
+
+    async def complete_multipart_upload(self, **_: str) -> dict:
+        return {'ETag': '"etag"'}
+
+    async def abort_multipart_upload(self, **params: str) -> None:
+        self.aborted.append(params['UploadId'])
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(service, 'UPLOAD_CHUNK_SIZE', CHUNK_SIZE)
+
+
+@pytest.fixture(autouse=True)
+def no_index(monkeypatch: pytest.MonkeyPatch):
+    async def index_files(*_: object) -> None:
+        pass
+
+    monkeypatch.setattr(S3Service(), 'index_files', index_files)
+
+
+def upload_file(client: FakeS3Client, size: int = CHUNK_SIZE * CHUNKS) -> None:
+    async def get_client() -> FakeS3Client:
+        return client
+
+    file = UploadFile(
+        io.BytesIO(b'x' * size),
+        size=size,
+        headers=Headers({'content-type': 'image/png'}),
+    )
+    s3_service = S3Service()
+    s3_service.get_client = get_client
+    try:
+        asyncio.run(s3_service.upload_file(S3Folders.AVATARS, file, 'key'))
+    finally:
+        del s3_service.get_client
+
+
+@pytest.mark.parametrize(
+    'error', [ValueError('Broken body'), asyncio.CancelledError()]
+)
+def test_failed_upload_is_aborted(error: BaseException):
+    client = FakeS3Client(error)
+
+    with pytest.raises(type(error)):
+        upload_file(client)
+
+    assert client.aborted == ['upload-key']
+    # Parts already in flight when the first one failed, nothing after
+    assert client.parts <= UPLOAD_CONCURRENCY
+
+
+def test_small_file_is_put_at_once():
+    client = FakeS3Client()
+
+    upload_file(client, CHUNK_SIZE - 1)
+
+    assert client.put_objects == ['key']
+    assert client.parts == 0
+
+
+def test_parts_in_flight_are_limited():
+    client = FakeS3Client()
+
+    upload_file(client)
+
+    assert client.parts == CHUNKS
+    assert client.max_in_flight == UPLOAD_CONCURRENCY
@@ -0,0 +1,58 @@
+import uuid
+from collections.abc import Iterator
+
+import pytest
+from sqlalchemy import delete
+
+from car_wash.cars.brands.repository import CarBrandRepository
+from car_wash.cars.brands.schemas import BrandList
+from car_wash.cars.models import CarBrand
+from car_wash.database import async_session_maker
+from car_wash.utils.schemas import GenericListResponse
+from car_wash.utils.service import GenericCRUDService
+from tests.conftest import Run
+
+BRANDS = 3
+
+
+class BrandService(GenericCRUDService[CarBrand]):
+    repository = CarBrandRepository
+
+
+async def add_brands(names: list[str]) -> None:
+    async with async_session_maker() as session, session.begin():
+        session.add_all(CarBrand(name=name) for name in names)
+
+
+async def remove_brands(names: list[str]) -> None:
+    async with async_session_maker() as session, session.begin():
+        await session.execute(delete(CarBrand).where(CarBrand.name.in_(names)))
+
+
+@pytest.fixture
+def brand_token(run: Run, database: None) -> Iterator[str]:  # noqa: ARG001
+    token = uuid.uuid4().hex[:8]
+    names = [f'{token} brand {number}' for number in range(BRANDS)]
+    run(add_brands(names))
+    try:
+        yield token
+    finally:
+        run(remove_brands(names))
+
+
+async def paginate(query: BrandList) -> GenericListResponse:
+    return await BrandService().paginate_entities(query)
+
+
+def test_ranked_page_has_no_cursor(run: Run, brand_token: str):
+    response = run(paginate(BrandList(limit=1, name_like=brand_token)))
+
+    assert response.total == BRANDS
+    assert response.next_cursor is None
+
+
+def test_unranked_page_has_cursor(run: Run, brand_token: str):
+    # Too short for trigrams, matched by prefix without a ranking
+    response = run(paginate(BrandList(limit=1, name_like=brand_token[:2])))
+
+    assert response.next_cursor is not None
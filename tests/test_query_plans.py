@@ -0,0 +1,201 @@
+import re
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import date, timedelta
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from car_wash.database import async_engine
+from car_wash.washes.bookings.repository import BookingRepository
+from car_wash.washes.repository import CarWashRepository
+from tests.conftest import Run, SeededCarWash, record_statements
+
+CAR_WASHES = 400
+BOXES_PER_CAR_WASH = 5
+BOOKINGS_PER_BOX = 20
+AVAILABILITY_DAYS = 14
+
+# Tables that grow with the number of car washes, users and bookings
+LARGE_TABLES = {
+    'car_wash__booking',
+    'car_wash__box',
+    'car_wash__box_availability',
+    'car_wash__price',
+    'user',
+    'user_car',
+}
+SEQ_SCAN_PATTERN = re.compile(r'Seq Scan on "?(\w+)"?')
+
+# Other car washes, users and bookings around the seeded ones, so the
+# planner sees tables of a realistic size
+SEED_STATEMENTS = [
+    """
+    INSERT INTO car_wash (name, active, location_id)
+    SELECT :prefix || n, true, location_id
+    FROM car_wash, generate_series(1, :car_washes) AS n
+    WHERE id = :car_wash_id
+    """,
+    """
+    INSERT INTO car_wash__schedule
+        (car_wash_id, day_of_week, start_time, end_time, is_available)
+    SELECT id, day_of_week, '08:00', '22:00', true
+    FROM car_wash, generate_series(0, 6) AS day_of_week
+    WHERE name LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO car_wash__price (car_wash_id, body_type_id, price)
+    SELECT id, :body_type_id, 1000
+    FROM car_wash
+    WHERE name LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO car_wash__box (name, car_wash_id, user_id)
+    SELECT 'Box ' || n, id, :user_id
+    FROM car_wash, generate_series(1, :boxes_per_car_wash) AS n
+    WHERE name LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO "user" (
+        username, hashed_password, first_name, last_name,
+        confirmed, active, role_id
+    )
+    SELECT :prefix || n, '', 'Plan', 'User', true, true, role_id
+    FROM "user", generate_series(1, :users) AS n
+    WHERE id = :user_id
+    """,
+    """
+    INSERT INTO user_car
+        (name, user_id, configuration_id, is_verified, license_plate)
+    SELECT 'Car', "user".id, user_car.configuration_id, true, 'A000AA'
+    FROM "user", user_car
+    WHERE "user".username LIKE :prefix || '%' AND user_car.id = :user_car_id
+    """,
+    """
+    WITH boxes AS (
+        SELECT box.id, row_number() OVER (ORDER BY box.id) AS number
+        FROM car_wash__box AS box
+        JOIN car_wash ON car_wash.id = box.car_wash_id
+        WHERE car_wash.name LIKE :prefix || '%'
+    ), cars AS (
+        SELECT user_car.id, row_number() OVER (ORDER BY user_car.id) AS number
+        FROM user_car
+        JOIN "user" ON "user".id = user_car.user_id
+        WHERE "user".username LIKE :prefix || '%'
+    )
+    INSERT INTO car_wash__booking (
+        user_car_id, box_id, base_price, total_price, additions,
+        start_datetime, end_datetime, state
+    )
+    SELECT
+        cars.id, boxes.id, 1000, 1000, '[]',
+        CAST(:day AS timestamp) + n * interval '1 day' + interval '10 hours',
+        CAST(:day AS timestamp) + n * interval '1 day' + interval '12 hours',
+        'CREATED'
+    FROM boxes
+    JOIN cars ON cars.number = boxes.number,
+    generate_series(1, :bookings_per_box) AS n
+    """,
+    """
+    INSERT INTO car_wash__box_availability (box_id, day, occupied)
+    SELECT box.id, CAST(:day AS date) + n, repeat('0', 1440)::bit(1440)
+    FROM car_wash__box AS box
+    JOIN car_wash ON car_wash.id = box.car_wash_id,
+    generate_series(0, :availability_days - 1) AS n
+    WHERE car_wash.name LIKE :prefix || '%'
+    """,
+]
+
+
+def get_hot_paths(
+    seeded: SeededCarWash, day: date
+) -> dict[str, Callable[[], Awaitable[Any]]]:
+    car_washes = CarWashRepository()
+    bookings = BookingRepository()
+    return {
+        'schedule and availability': lambda: (
+            car_washes.fetch_schedule_and_availability(
+                seeded.car_wash_id, day, day + timedelta(days=6)
+            )
+        ),
+        'bookings of a car wash': lambda: bookings.find_many_with_total(
+            1, 10, 'id', {'car_wash_id': seeded.car_wash_id}
+        ),
+        'bookings of a user': lambda: bookings.find_many_with_total(
+            1, 10, 'id', {'user_id': seeded.user_id}
+        ),
+        'pricing': lambda: bookings.fetch_pricing(
+            seeded.box_ids[0], seeded.user_car_id, day
+        ),
+    }
+
+
+async def capture_statements(
+    hot_paths: dict[str, Callable[[], Awaitable[Any]]],
+) -> dict[str, list[tuple[str, Any]]]:
+    statements = {}
+    for name, hot_path in hot_paths.items():
+        with record_statements() as recorded:
+            await hot_path()
+        statements[name] = [
+            (statement, parameters)
+            for statement, parameters in recorded
+            if statement.lstrip().upper().startswith('SELECT')
+        ]
+    return statements
+
+
+async def seed(
+    connection: AsyncConnection, seeded: SeededCarWash, day: date
+) -> None:
+    parameters = {
+        'prefix': f'Plan {uuid.uuid4().hex[:8]} ',
+        'car_wash_id': seeded.car_wash_id,
+        'user_id': seeded.user_id,
+        'user_car_id': seeded.user_car_id,
+        'body_type_id': seeded.body_type_id,
+        'day': day,
+        'car_washes': CAR_WASHES,
+        'boxes_per_car_wash': BOXES_PER_CAR_WASH,
+        # A user with a car for every box
+        'users': CAR_WASHES * BOXES_PER_CAR_WASH,
+        'bookings_per_box': BOOKINGS_PER_BOX,
+        'availability_days': AVAILABILITY_DAYS,
+    }
+    for statement in SEED_STATEMENTS:
+        await connection.execute(text(statement), parameters)
+    tables = ', '.join(f'"{table}"' for table in LARGE_TABLES)
+    await connection.execute(text(f'ANALYZE {tables}'))
+
+
+async def find_seq_scans(
+    seeded: SeededCarWash, day: date
+) -> dict[str, set[str]]:
+    statements = await capture_statements(get_hot_paths(seeded, day))
+    assert all(statements.values())
+
+    seq_scans = {}
+    async with async_engine.connect() as connection:
+        # Never committed, the seeded rows go away with the transaction
+        await seed(connection, seeded, day)
+        for name, recorded in statements.items():
+            for statement, parameters in recorded:
+                plan = await connection.exec_driver_sql(
+                    f'EXPLAIN {statement}', parameters
+                )
+                scanned = {
+                    table
+                    for line in plan.scalars()
+                    for table in SEQ_SCAN_PATTERN.findall(line)
+                }
+                if scanned & LARGE_TABLES:
+                    seq_scans[name] = scanned & LARGE_TABLES
+        await connection.rollback()
+    return seq_scans
+
+
+def test_hot_paths_do_not_scan_large_tables(run: Run, seeded: SeededCarWash):
+    day = date.today() + timedelta(days=7)  # noqa: DTZ011
+
+    assert run(find_seq_scans(seeded, day)) == {}
@@ -0,0 +1,125 @@
+import asyncio
+from types import TracebackType
+
+import pytest
+from fastapi import Request
+
+from car_wash import database
+from car_wash.database import (
+    UnitOfWork,
+    get_unit_of_work,
+    read_from_primary,
+)
+from car_wash.users.repository import UserRepository
+
+
+class FakeSession:
+    def __init__(self, name: str):
+        self.name = name
+        self.info = {}
+
+    async def __aenter__(self) -> 'FakeSession':
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        pass
+
+    async def commit(self) -> None:
+        pass
+
+    async def rollback(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeSessionMaker:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __call__(self) -> FakeSession:
+        return FakeSession(self.name)
+
+
+@pytest.fixture
+def replica(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(database, 'replica_engine', object())
+    monkeypatch.setattr(
+        database, 'replica_session_maker', FakeSessionMaker('replica')
+    )
+    monkeypatch.setattr(
+        database, 'async_session_maker', FakeSessionMaker('primary')
+    )
+
+
+async def read_session_name() -> str:
+    async with UserRepository().session() as session:
+        return session.name
+
+
+async def read_in_unit_of_work(
+    *, read_only: bool = True, write_first: bool = False
+) -> str:
+    async with UnitOfWork(read_only=read_only):
+        if write_first:
+            async with UserRepository().transaction():
+                pass
+        return await read_session_name()
+
+
+@pytest.mark.usefixtures('replica')
+def test_reads_outside_of_unit_of_work_go_to_replica():
+    assert asyncio.run(read_session_name()) == 'replica'
+
+
+@pytest.mark.usefixtures('replica')
+def test_reads_inside_of_read_only_unit_of_work_go_to_replica():
+    assert asyncio.run(read_in_unit_of_work()) == 'replica'
+
+
+@pytest.mark.usefixtures('replica')
+def test_reads_inside_of_writing_unit_of_work_use_its_session():
+    name = asyncio.run(read_in_unit_of_work(read_only=False))
+    assert name == 'primary'
+
+
+@pytest.mark.usefixtures('replica')
+def test_reads_after_write_use_unit_of_work_session():
+    name = asyncio.run(read_in_unit_of_work(write_first=True))
+    assert name == 'primary'
+
+
+@pytest.mark.usefixtures('replica')
+def test_read_from_primary_uses_unit_of_work_session():
+    async def read() -> str:
+        with read_from_primary():
+            return await read_in_unit_of_work()
+
+    assert asyncio.run(read()) == 'primary'
+
+
+def is_read_only(method: str) -> bool:
+    async def open_unit_of_work() -> bool:
+        request = Request({'type': 'http', 'method': method})
+        unit_of_work = get_unit_of_work(request)
+        uow = await unit_of_work.__anext__()
+        await unit_of_work.aclose()
+        return uow.read_only
+
+    return asyncio.run(open_unit_of_work())
+
+
+@pytest.mark.parametrize('method', ['GET', 'HEAD'])
+def test_safe_methods_get_read_only_unit_of_work(method: str):
+    assert is_read_only(method)
+
+
+@pytest.mark.parametrize('method', ['POST', 'PATCH', 'DELETE'])
+def test_other_methods_get_writing_unit_of_work(method: str):
+    assert not is_read_only(method)
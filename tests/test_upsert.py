@@ -0,0 +1,78 @@
+import uuid
+from collections.abc import Iterator
+
+import pytest
+from sqlalchemy import delete, select
+
+from car_wash.cars.generations.repository import CarGenerationRepository
+from car_wash.cars.models import CarBrand, CarGeneration, CarModel
+from car_wash.database import async_session_maker
+from tests.conftest import Run
+
+
+async def add_model() -> int:
+    async with async_session_maker() as session, session.begin():
+        brand = CarBrand(name=f'Brand {uuid.uuid4().hex[:8]}')
+        session.add(brand)
+        await session.flush()
+        model = CarModel(name='Model', brand_id=brand.id)
+        session.add(model)
+        await session.flush()
+        return model.id
+
+
+async def remove_model(model_id: int) -> None:
+    async with async_session_maker() as session, session.begin():
+        model = await session.get(CarModel, model_id)
+        await session.execute(
+            delete(CarGeneration).where(CarGeneration.model_id == model_id)
+        )
+        await session.delete(model)
+        await session.execute(
+            delete(CarBrand).where(CarBrand.id == model.brand_id)
+        )
+
+
+async def find_generations(model_id: int) -> list[tuple]:
+    async with async_session_maker() as session:
+        res = await session.execute(
+            select(
+                CarGeneration.id, CarGeneration.name, CarGeneration.end_year
+            )
+            .where(CarGeneration.model_id == model_id)
+            .order_by(CarGeneration.id)
+        )
+        return [tuple(row) for row in res]
+
+
+@pytest.fixture
+def model_id(run: Run, database: None) -> Iterator[int]:  # noqa: ARG001
+    model_id = run(add_model())
+    try:
+        yield model_id
+    finally:
+        run(remove_model(model_id))
+
+
+def get_rows(model_id: int, end_year: str) -> list[dict]:
+    return [
+        {
+            'name': name,
+            'model_id': model_id,
+            'start_year': '2000',
+            'end_year': end_year,
+        }
+        for name in (None, 'II')
+    ]
+
+
+def test_null_names_are_upserted_once(run: Run, model_id: int):
+    repository = CarGenerationRepository()
+
+    ids = run(repository.upsert_many(get_rows(model_id, '2005')))
+    assert run(repository.upsert_many(get_rows(model_id, 'present'))) == ids
+
+    assert run(find_generations(model_id)) == [
+        (ids[0], None, 'present'),
+        (ids[1], 'II', 'present'),
+    ]